@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import collections
+import itertools
 import os
-from collections.abc import Sequence
-
-import more_itertools
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Optional
 
 
 def main():
@@ -21,39 +22,75 @@ def main():
     print(p2_answer)
 
 
-def find_first_corrupt(numbers: list[int], window_size: int) -> int:
+def find_first_corrupt(numbers: Iterable[int], window_size: int) -> int:
     """
-    Finds the first corrupt number in O(nm log m) running time, where:
+    Finds the first corrupt number in O(nm) running time, where:
     - n: size of the input list of numbers
     - m: window size
     """
-    for window_plus_one in more_itertools.windowed(numbers, window_size + 1):
-        preceding_numbers = window_plus_one[:-1]
-        target = window_plus_one[-1]
-        if not pair_with_target_sum(preceding_numbers, target):
-            return target
+    for value in generate_corrupt_numbers(numbers, window_size):
+        return value
     raise RuntimeError('cannot find a candidate')
 
 
-def pair_with_target_sum(numbers: Sequence[int], target: int) -> bool:
+def generate_corrupt_numbers(numbers: Iterable[int], window_size: int) -> Iterator[int]:
+    """
+    Produces every corrupt number from a possibly unbounded stream of numbers
+    as soon as it arrives. Only the preceding window of numbers is kept in memory.
+    """
+    window = PairSumWindow(capacity=window_size)
+    for value in numbers:
+        if window.is_full() and not window.has_pair_sum(value):
+            yield value
+        window.push(value)
+
+
+@dataclass
+class PairSumWindow:
     """
-    Determines whether there are two elements in the given list of numbers
-    whose sum matches the given target.
-    This function implements what is called two-pointers technique:
-    1. Sort the list of numbers
-    2. Consider a pair of points pointing to two numbers starting at each end of the list
-    3. Move one of the pointers towards each other to adjust their sum to match the target
+    Sliding window of the most recent numbers which is also kept as a multiset counter
+    so that the window can be updated with one push and one pop per step
+    and queried for a pair sum without sorting its content.
     """
-    numbers = sorted(numbers)
-    lo, hi = 0, len(numbers) - 1
-    while lo < hi:
-        if numbers[lo] + numbers[hi] < target:
-            lo += 1
-        elif numbers[lo] + numbers[hi] > target:
-            hi -= 1
-        else:
-            return True
-    return False
+    capacity: int
+    numbers: collections.deque[int] = field(default_factory=collections.deque)
+    counts: collections.Counter[int] = field(default_factory=collections.Counter)
+
+    def is_full(self) -> bool:
+        return len(self.numbers) >= self.capacity
+
+    def push(self, value: int):
+        """
+        Adds a new number to the window, evicting the oldest number if the window is full.
+        """
+        if self.is_full():
+            self.pop()
+        self.numbers.append(value)
+        self.counts[value] += 1
+
+    def pop(self) -> int:
+        """
+        Evicts the oldest number from the window.
+        """
+        value = self.numbers.popleft()
+        self.counts[value] -= 1
+        if not self.counts[value]:
+            del self.counts[value]
+        return value
+
+    def has_pair_sum(self, target: int) -> bool:
+        """
+        Determines whether there are two elements in the window whose sum matches the given target.
+        Each distinct value in the window is looked up against its complement,
+        hence the running time is linear to the number of distinct values in the window.
+        """
+        for value in self.counts:
+            complement = target - value
+            if complement != value and complement in self.counts:
+                return True
+            if complement == value and self.counts[value] >= 2:
+                return True
+        return False
 
 
 def find_encryption_weakness(numbers: list[int], target: int) -> int:
@@ -73,14 +110,116 @@ def find_encryption_weakness(numbers: list[int], target: int) -> int:
     raise RuntimeError('cannot find a candidate')
 
 
+def find_encryption_weaknesses(numbers: list[int], targets: Iterable[int]) -> dict[int, int]:
+    """
+    Finds the encryption weakness for each of the given targets.
+    The index over the numbers is built once in O(n log n) running time,
+    after which each target is answered in O(n) running time
+    but without any additional O(window) scanning for its minimum and maximum.
+    """
+    index = PrefixSumIndex.from_numbers(numbers)
+    return {target: index.encryption_weakness(target) for target in targets}
+
+
+@dataclass
+class PrefixSumIndex:
+    """
+    Precomputed prefix sums over a list of numbers
+    together with range minimum and range maximum lookup tables.
+    """
+    prefix_sums: list[int]
+    first_positions: dict[int, int]
+    min_table: SparseTable
+    max_table: SparseTable
+
+    @classmethod
+    def from_numbers(cls, numbers: list[int]) -> PrefixSumIndex:
+        prefix_sums = list(itertools.accumulate(numbers, initial=0))
+        first_positions = {}
+        for position, prefix_sum in enumerate(prefix_sums):
+            first_positions.setdefault(prefix_sum, position)
+        return PrefixSumIndex(
+            prefix_sums, first_positions,
+            min_table=SparseTable.from_numbers(numbers, func=min),
+            max_table=SparseTable.from_numbers(numbers, func=max),
+        )
+
+    def find_range(self, target: int) -> Optional[tuple[int, int]]:
+        """
+        Finds the earliest ending range of at least two contiguous numbers
+        whose sum matches the given target, returned as a pair of start (inclusive)
+        and stop (exclusive) indices. Returns None if there is no such range.
+        """
+        for stop in range(2, len(self.prefix_sums)):
+            start = self.first_positions.get(self.prefix_sums[stop] - target)
+            if start is not None and start <= stop - 2:
+                return start, stop
+        return None
+
+    def encryption_weakness(self, target: int) -> int:
+        """
+        Computes the sum of the smallest and the largest numbers
+        within the contiguous range whose sum matches the given target.
+        """
+        found_range = self.find_range(target)
+        if found_range is None:
+            raise RuntimeError('cannot find a candidate')
+        start, stop = found_range
+        return self.min_table.query(start, stop) + self.max_table.query(start, stop)
+
+
+@dataclass
+class SparseTable:
+    """
+    Answers range queries of an idempotent function (such as min or max)
+    in O(1) running time after O(n log n) preprocessing.
+    The table at level k stores the results for all ranges of length 2^k.
+    """
+    func: Callable[[int, int], int]
+    levels: list[list[int]]
+
+    @classmethod
+    def from_numbers(cls, numbers: list[int], func: Callable[[int, int], int]) -> SparseTable:
+        levels = [list(numbers)]
+        width = 1
+        while 2 * width <= len(numbers):
+            prev_level = levels[-1]
+            levels.append([
+                func(prev_level[i], prev_level[i + width])
+                for i in range(len(prev_level) - width)
+            ])
+            width *= 2
+        return SparseTable(func, levels)
+
+    def query(self, start: int, stop: int) -> int:
+        """
+        Computes the function over the numbers from index start (inclusive) to stop (exclusive).
+        """
+        if not 0 <= start < stop <= len(self.levels[0]):
+            raise ValueError(f"invalid range: [{start}, {stop})")
+        level = (stop - start).bit_length() - 1
+        table = self.levels[level]
+        return self.func(table[start], table[stop - (1 << level)])
+
+
 def read_input_files(input_file: str) -> list[int]:
     """
     Extracts a list of numbers from the input file.
     """
     with open(input_file) as input_fobj:
-        numbers = [int(line) for line in input_fobj]
+        numbers = list(read_input_stream(input_fobj))
     return numbers
 
 
+def read_input_stream(lines: Iterable[str]) -> Iterator[int]:
+    """
+    Lazily extracts numbers from a stream of lines (such as an open file or a socket),
+    skipping over blank lines.
+    """
+    for line in lines:
+        if line.strip():
+            yield int(line)
+
+
 if __name__ == '__main__':
     main()
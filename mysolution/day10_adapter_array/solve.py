@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import collections
+import functools
 import itertools
 import os
+from collections.abc import Iterable, Iterator
+from typing import Optional
 
 import more_itertools
 
@@ -34,25 +37,140 @@ def diff_counts_in_jolt_chain(adapters: list[int], gap: int) -> collections.Coun
     return diff_counts
 
 
-def count_valid_jolt_chains(adapters: list[int], gap: int) -> int:
+def count_valid_jolt_chains(adapters: list[int], gap: int, modulus: Optional[int] = None) -> int:
     """
     Count the number of configurations of functioning jolt chains
     from the charging outlet (0) to the built-in adapter
     (where two consecutive power devices must be within the given gap).
+    If modulus is given, the count is computed modulo such number.
 
-    This function implements a dynamic programming algorithm with O(nk) running time
-    where n is the number of adapters and k is the input gap size.
-    An improved version of this algorithm using O(n) time (not implemented here)
-    is to maintain a sliding window of preceding config counts plus their total sum.
+    This function implements a dynamic programming algorithm with O(n log n) running time
+    (dominated by sorting) where n is the number of adapters, regardless of the gap size.
     """
     builtin_adapter = max(adapters) + gap
     jolt_chain = itertools.chain([0], sorted(adapters), [builtin_adapter])
+    return count_sorted_jolt_chains(jolt_chain, gap, modulus)
 
-    config_counts = collections.Counter({0: 1})
+
+def count_sorted_jolt_chains(jolt_chain: Iterable[int], gap: int, modulus: Optional[int] = None) -> int:
+    """
+    Count the number of configurations of functioning jolt chains
+    from the first to the last power device of the given strictly increasing stream of joltages.
+    This function runs in O(n) time and only keeps the devices within the gap in memory.
+    """
+    _, config_count = more_itertools.last(generate_jolt_chain_counts(jolt_chain, gap, modulus))
+    return config_count
+
+
+def generate_jolt_chain_counts(
+        jolt_chain: Iterable[int], gap: int, modulus: Optional[int] = None,
+) -> Iterator[tuple[int, int]]:
+    """
+    Produces pairs of joltage and the number of configurations of jolt chains
+    from the first power device up to such device, for each device in the given stream
+    of strictly increasing joltages.
+
+    This function maintains a sliding window of preceding config counts
+    (only those within the gap from the current device) plus their total sum,
+    so each device is processed in amortized O(1) time.
+    """
+    jolt_chain = iter(jolt_chain)
+    source_jolt = next(jolt_chain, None)
+    if source_jolt is None:
+        raise ValueError('jolt chain cannot be empty')
+    window = collections.deque([(source_jolt, 1)])
+    window_sum = 1
+    yield source_jolt, 1
+
+    prev_jolt = source_jolt
     for jolt in jolt_chain:
-        for downstep in range(-gap, 0):
-            config_counts[jolt] += config_counts[jolt + downstep]
-    return config_counts[builtin_adapter]
+        if jolt <= prev_jolt:
+            raise ValueError(f"joltages must be strictly increasing: {prev_jolt} then {jolt}")
+        prev_jolt = jolt
+        while window and window[0][0] < jolt - gap:
+            _, expired_count = window.popleft()
+            window_sum -= expired_count
+        config_count = window_sum
+        if modulus is not None:
+            config_count %= modulus
+        window.append((jolt, config_count))
+        window_sum += config_count
+        yield jolt, config_count
+
+
+def count_valid_jolt_chains_by_runs(adapters: list[int], gap: int, modulus: Optional[int] = None) -> int:
+    """
+    Same as `count_valid_jolt_chains` but optimized for adapters
+    which mostly form long runs of consecutive (1-jolt apart) joltages.
+
+    Two consecutive power devices which are at least the gap apart must both appear
+    in every jolt chain (unless they are more than the gap apart and no chain is possible),
+    so the jolt chain is split at such places into segments
+    whose numbers of configurations are multiplied together.
+    Each segment consisting purely of 1-jolt steps has its number of configurations
+    computed in O(k^3 log m) running time where k is the gap size and m is the segment length.
+    Other segments fall back to the sliding window algorithm.
+    """
+    builtin_adapter = max(adapters) + gap
+    jolt_chain = itertools.chain([0], sorted(adapters), [builtin_adapter])
+
+    total_count = 1
+    prev_segment = None
+    for segment in more_itertools.split_when(jolt_chain, lambda lo, hi: hi - lo >= gap):
+        if prev_segment is not None and segment[0] - prev_segment[-1] > gap:
+            return 0
+        if segment[-1] - segment[0] == len(segment) - 1:
+            segment_count = count_unit_run_chains(len(segment) - 1, gap, modulus)
+        else:
+            segment_count = count_sorted_jolt_chains(segment, gap, modulus)
+        total_count *= segment_count
+        if modulus is not None:
+            total_count %= modulus
+        prev_segment = segment
+    return total_count
+
+
+@functools.lru_cache(maxsize=None)
+def count_unit_run_chains(length: int, gap: int, modulus: Optional[int] = None) -> int:
+    """
+    Counts the number of configurations of jolt chains across a run of `length` 1-jolt steps
+    where both ends of the run are mandatory.
+    Such counts follow the linear recurrence f(m) = f(m-1) + f(m-2) + ... + f(m-k)
+    where k is the gap size, which is computed by exponentiation of its companion matrix.
+    """
+    companion = [
+        [1 if row == 0 or row == col + 1 else 0 for col in range(gap)]
+        for row in range(gap)
+    ]
+    return matrix_power(companion, length, modulus)[0][0]
+
+
+Matrix = list[list[int]]
+
+
+def matrix_power(matrix: Matrix, exponent: int, modulus: Optional[int] = None) -> Matrix:
+    """
+    Computes the power of a square matrix by repeated squaring.
+    """
+    size = len(matrix)
+    result = [[int(row == col) for col in range(size)] for row in range(size)]
+    while exponent:
+        if exponent & 1:
+            result = matrix_multiply(result, matrix, modulus)
+        matrix = matrix_multiply(matrix, matrix, modulus)
+        exponent >>= 1
+    return result
+
+
+def matrix_multiply(left: Matrix, right: Matrix, modulus: Optional[int] = None) -> Matrix:
+    right_cols = list(zip(*right))
+    product = [
+        [sum(a * b for a, b in zip(row, col)) for col in right_cols]
+        for row in left
+    ]
+    if modulus is not None:
+        product = [[value % modulus for value in row] for row in product]
+    return product
 
 
 def read_input_files(input_file: str) -> list[int]:
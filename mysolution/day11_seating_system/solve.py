@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import enum
 import itertools
+import multiprocessing
 import os
 from collections.abc import Sequence
-from dataclasses import dataclass
-from typing import Literal, Optional
+from dataclasses import dataclass, field
+from typing import Literal, Optional, TypeVar
+
+import numpy as np
 
 TraceMode = Literal['adjacent', 'visible']
 GRADIENTS = [(-1, 1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
@@ -14,30 +17,188 @@ GRADIENTS = [(-1, 1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)
 def main():
     this_dir = os.path.dirname(os.path.abspath(__file__))
     input_file = os.path.join(this_dir, 'input.txt')
-    seatmap = read_input_files(input_file)
+    seatmap = ArraySeatMap.from_seatmap(read_input_files(input_file))
 
     # Part 1
     stable_seatmap_by_adjacency = repeat_until_stable(seatmap, trace='adjacent', tolerance=4)
-    p1_answer = sum(s == Seat.OCCUPIED for s in stable_seatmap_by_adjacency.area.values())
+    p1_answer = stable_seatmap_by_adjacency.count_occupied()
     print(p1_answer)
 
     # Part 2
     stable_seatmap_by_visibility = repeat_until_stable(seatmap, trace='visible', tolerance=5)
-    p2_answer = sum(s == Seat.OCCUPIED for s in stable_seatmap_by_visibility.area.values())
+    p2_answer = stable_seatmap_by_visibility.count_occupied()
     print(p2_answer)
 
 
-def repeat_until_stable(seatmap: SeatMap, trace: TraceMode, tolerance: int) -> SeatMap:
+def repeat_until_stable(
+        seatmap: AnySeatMap, trace: TraceMode, tolerance: int, num_bands: Optional[int] = None,
+) -> AnySeatMap:
     """
     Repeatedly compute the next state of the seatmap
     until it converges to a stationery state.
+    If num_bands is given, the computation is distributed across as many worker processes
+    (see `repeat_until_stable_in_bands`).
     """
+    if num_bands is not None:
+        if isinstance(seatmap, ArraySeatMap):
+            return repeat_until_stable_in_bands(seatmap, trace, tolerance, num_bands)
+        array_seatmap = ArraySeatMap.from_seatmap(seatmap)
+        return repeat_until_stable_in_bands(array_seatmap, trace, tolerance, num_bands).to_seatmap()
+
     for _ in itertools.count(start=1):
         prev_seatmap, seatmap = seatmap, seatmap.next_round(trace, tolerance)
         if seatmap == prev_seatmap:
             return seatmap
 
 
+def repeat_until_stable_in_bands(
+        seatmap: ArraySeatMap, trace: TraceMode, tolerance: int, num_bands: int,
+) -> ArraySeatMap:
+    """
+    Same as `repeat_until_stable` but the area is split into horizontal bands of rows,
+    each of which is computed by a worker in a process pool.
+    The area lives in two shared memory buffers which alternate as the current and the next state,
+    so that workers can read halo rows (or any visible seats) beyond their bands
+    directly from the current state. The simulation stops once no bands have changed in a round.
+    """
+    row_size, col_size = seatmap.area.shape
+    context = multiprocessing.get_context()
+
+    # The extra trailing FLOOR location serves the sentinel index of trace tables
+    buffers = [context.RawArray('B', seatmap.area.size + 1) for _ in range(2)]
+    np.frombuffer(buffers[0], dtype=np.uint8)[:-1] = seatmap.area.ravel()
+    table_buffer = table_spec = None
+    if trace == 'visible':
+        table = seatmap.get_trace_table(trace)
+        table_buffer = context.RawArray('B', table.nbytes)
+        np.frombuffer(table_buffer, dtype=table.dtype).reshape(table.shape)[:] = table
+        table_spec = (table.dtype.str, table.shape)
+
+    bands = [(rows[0], rows[-1] + 1) for rows in np.array_split(range(row_size), num_bands) if rows.size]
+    initargs = (buffers, (row_size, col_size), table_buffer, table_spec)
+    with context.Pool(len(bands), initializer=attach_band_buffers, initargs=initargs) as pool:
+        for round_index in itertools.count():
+            current = round_index % 2
+            tasks = [(start, stop, current, trace, tolerance) for start, stop in bands]
+            if not any(pool.starmap(advance_band, tasks)):
+                break
+
+    area = np.frombuffer(buffers[current], dtype=np.uint8)[:-1].reshape(row_size, col_size)
+    return ArraySeatMap(area.copy(), seatmap.trace_tables)
+
+
+# Shared memory buffers attached to each band worker process
+_band_buffers = {}
+
+
+def attach_band_buffers(buffers, shape, table_buffer, table_spec):
+    _band_buffers['areas'] = [np.frombuffer(b, dtype=np.uint8) for b in buffers]
+    _band_buffers['shape'] = shape
+    if table_buffer is not None:
+        dtype, table_shape = table_spec
+        _band_buffers['table'] = np.frombuffer(table_buffer, dtype=dtype).reshape(table_shape)
+
+
+def advance_band(start: int, stop: int, current: int, trace: TraceMode, tolerance: int) -> bool:
+    """
+    Computes the next state of the rows from start (inclusive) to stop (exclusive)
+    within the band worker process. Returns whether any location in the band has changed.
+    """
+    row_size, col_size = _band_buffers['shape']
+    area = _band_buffers['areas'][current]
+    next_area = _band_buffers['areas'][1 - current]
+    band = area[start * col_size:stop * col_size].reshape(stop - start, col_size)
+
+    if trace == 'adjacent':
+        halo_start, halo_stop = max(start - 1, 0), min(stop + 1, row_size)
+        halo_area = area[halo_start * col_size:halo_stop * col_size].reshape(halo_stop - halo_start, col_size)
+        occupied_counts = ArraySeatMap(halo_area).count_adjacent_occupied()[start - halo_start:stop - halo_start]
+    elif trace == 'visible':
+        table = _band_buffers['table'][start * col_size:stop * col_size]
+        occupied_counts = (area[table] == SEAT_CODES[Seat.OCCUPIED]).sum(axis=1).reshape(band.shape)
+    else:
+        raise RuntimeError(f"unknown trace mode {trace!r}")
+
+    next_band = apply_seat_rules(band, occupied_counts, tolerance)
+    next_area[start * col_size:stop * col_size] = next_band.ravel()
+    return not np.array_equal(band, next_band)
+
+
+def repeat_until_stable_incrementally(
+        seatmap: ArraySeatMap, trace: TraceMode, tolerance: int,
+) -> tuple[ArraySeatMap, list[int]]:
+    """
+    Same as `repeat_until_stable` but only re-evaluates the frontier of seats
+    whose own state or traced seats have changed in the previous round,
+    since all other seats would remain the same.
+    The simulation stops once the frontier becomes empty.
+    Returns the stationary seatmap along with the number of changed seats in each round.
+    """
+    table = seatmap.get_trace_table(trace)
+    reverse_offsets, reverse_indices = build_reverse_table(table)
+    area = seatmap.area.ravel().copy()
+    occupied = np.append(area == SEAT_CODES[Seat.OCCUPIED], False)
+
+    change_counts = []
+    seats = np.flatnonzero(area != SEAT_CODES[Seat.FLOOR])
+    frontier = seats
+    in_frontier = np.zeros(area.size, dtype=bool)
+    while frontier.size:
+        occupied_counts = occupied[table[frontier]].sum(axis=1)
+        states = area[frontier]
+        to_occupy = frontier[(states == SEAT_CODES[Seat.EMPTY]) & (occupied_counts == 0)]
+        to_vacate = frontier[(states == SEAT_CODES[Seat.OCCUPIED]) & (occupied_counts >= tolerance)]
+        area[to_occupy] = SEAT_CODES[Seat.OCCUPIED]
+        area[to_vacate] = SEAT_CODES[Seat.EMPTY]
+        occupied[to_occupy] = True
+        occupied[to_vacate] = False
+
+        changed = np.concatenate([to_occupy, to_vacate])
+        if not changed.size:
+            break
+        change_counts.append(changed.size)
+        if changed.size * table.shape[1] >= seats.size:
+            # Gathering tracers would cost more than simply re-evaluating all seats
+            frontier = seats
+            continue
+        in_frontier[changed] = True
+        in_frontier[gather_ranges(reverse_offsets, reverse_indices, changed)] = True
+        frontier = np.flatnonzero(in_frontier)
+        in_frontier[frontier] = False
+
+    stable_seatmap = ArraySeatMap(area.reshape(seatmap.area.shape), seatmap.trace_tables)
+    return stable_seatmap, change_counts
+
+
+def build_reverse_table(table: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Inverts the table of traced locations (see `ArraySeatMap.get_trace_table`)
+    into compressed sparse row format: the locations which trace location i are stored
+    in the second returned array from position offsets[i] to offsets[i + 1],
+    where offsets is the first returned array.
+    """
+    size = table.shape[0]
+    sources = np.repeat(np.arange(size, dtype=table.dtype), table.shape[1])
+    targets = table.ravel()
+    is_valid = targets != size
+    sources, targets = sources[is_valid], targets[is_valid]
+    reverse_indices = sources[np.argsort(targets, kind='stable')]
+    offsets = np.zeros(size + 1, dtype=np.intp)
+    np.cumsum(np.bincount(targets, minlength=size), out=offsets[1:])
+    return offsets, reverse_indices
+
+
+def gather_ranges(offsets: np.ndarray, values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Concatenates values[offsets[k]:offsets[k + 1]] for all k in keys without a python loop.
+    """
+    starts = offsets[keys]
+    lengths = offsets[keys + 1] - starts
+    segment_starts = np.cumsum(lengths) - lengths
+    positions = np.repeat(starts - segment_starts, lengths) + np.arange(lengths.sum())
+    return values[positions]
+
+
 class Seat(enum.Enum):
     FLOOR = '.'
     EMPTY = 'L'
@@ -137,6 +298,195 @@ class SeatMap:
         return None
 
 
+SEAT_CODES = {Seat.FLOOR: 0, Seat.EMPTY: 1, Seat.OCCUPIED: 2}
+SEATS_BY_CODE = {code: seat for seat, code in SEAT_CODES.items()}
+
+
+@dataclass(eq=False)
+class ArraySeatMap:
+    """
+    Alternative representation of `SeatMap` which stores the area
+    as a 2D array of seat codes (see `SEAT_CODES`)
+    so that each round is computed with whole-array operations.
+    Tables of traced locations for each trace mode (see `get_trace_table`)
+    are computed lazily and cached alongside.
+    """
+    area: np.ndarray
+    trace_tables: dict[TraceMode, np.ndarray] = field(default_factory=dict)
+
+    def __eq__(self, other):
+        if not isinstance(other, ArraySeatMap):
+            return NotImplemented
+        return np.array_equal(self.area, other.area)
+
+    def __repr__(self):
+        return repr(self.to_seatmap())
+
+    @property
+    def row_size(self) -> int:
+        return self.area.shape[0]
+
+    @property
+    def col_size(self) -> int:
+        return self.area.shape[1]
+
+    @classmethod
+    def from_seatmap(cls, seatmap: SeatMap) -> ArraySeatMap:
+        area = np.zeros((seatmap.row_size, seatmap.col_size), dtype=np.uint8)
+        for (r, c), seat in seatmap.area.items():
+            area[r, c] = SEAT_CODES[seat]
+        return ArraySeatMap(area)
+
+    def to_seatmap(self) -> SeatMap:
+        area = {
+            (r, c): SEATS_BY_CODE[code]
+            for (r, c), code in np.ndenumerate(self.area)
+        }
+        return SeatMap(self.row_size, self.col_size, area)
+
+    def count_occupied(self) -> int:
+        return int(np.count_nonzero(self.area == SEAT_CODES[Seat.OCCUPIED]))
+
+    def next_round(self, trace: TraceMode, tolerance: int) -> ArraySeatMap:
+        """
+        Obtains the next seatmap state.
+        The rules are identical to `Seat.next_state` but applied to all seats at once.
+        """
+        if trace == 'adjacent':
+            occupied_counts = self.count_adjacent_occupied()
+        elif trace == 'visible':
+            occupied_counts = self.count_visible_occupied()
+        else:
+            raise RuntimeError(f"unknown trace mode {trace!r}")
+
+        next_area = apply_seat_rules(self.area, occupied_counts, tolerance)
+        return ArraySeatMap(next_area, self.trace_tables)
+
+    def count_adjacent_occupied(self) -> np.ndarray:
+        """
+        Counts the number of OCCUPIED adjacent seats (towards each of the gradients) of each location
+        by summing shifted slices of the zero-padded occupancy array.
+        """
+        padded = np.pad(self.area == SEAT_CODES[Seat.OCCUPIED], 1).astype(np.uint8)
+        counts = np.zeros(self.area.shape, dtype=np.uint8)
+        for grad_r, grad_c in GRADIENTS:
+            counts += padded[1 + grad_r:1 + grad_r + self.row_size, 1 + grad_c:1 + grad_c + self.col_size]
+        return counts
+
+    def count_visible_occupied(self) -> np.ndarray:
+        """
+        Counts the number of OCCUPIED visible seats (towards each of the gradients) of each location
+        by gathering the occupancy of the seats from the line-of-sight table.
+        """
+        occupied = np.append(self.area == SEAT_CODES[Seat.OCCUPIED], False)
+        counts = occupied[self.get_trace_table('visible')].sum(axis=1, dtype=np.uint8)
+        return counts.reshape(self.area.shape)
+
+    def get_trace_table(self, trace: TraceMode) -> np.ndarray:
+        """
+        Obtains the table of traced locations for the given trace mode, building it on first use
+        (see `build_adjacent_table` and `build_visible_table`).
+        Since FLOOR locations never change, the same table is shared with all subsequent rounds.
+        """
+        if trace not in self.trace_tables:
+            if trace == 'adjacent':
+                self.trace_tables[trace] = build_adjacent_table(self.area.shape)
+            elif trace == 'visible':
+                self.trace_tables[trace] = build_visible_table(self.area != SEAT_CODES[Seat.FLOOR])
+            else:
+                raise RuntimeError(f"unknown trace mode {trace!r}")
+        return self.trace_tables[trace]
+
+
+def apply_seat_rules(area: np.ndarray, occupied_counts: np.ndarray, tolerance: int) -> np.ndarray:
+    """
+    Computes the next state of an array of seat codes given the number of OCCUPIED traced seats
+    of each location, according to the same rules as `Seat.next_state`.
+    """
+    next_area = area.copy()
+    next_area[(area == SEAT_CODES[Seat.EMPTY]) & (occupied_counts == 0)] = SEAT_CODES[Seat.OCCUPIED]
+    next_area[(area == SEAT_CODES[Seat.OCCUPIED]) & (occupied_counts >= tolerance)] = SEAT_CODES[Seat.EMPTY]
+    return next_area
+
+
+def build_adjacent_table(shape: tuple[int, int]) -> np.ndarray:
+    """
+    Builds an adjacency table of shape (N, 8) where N is the number of locations in the area.
+    Row i of the table contains, for each of the gradients, the flat index of the adjacent location
+    from location i (flattened in row-major order), or N if it would be out of bounds.
+    """
+    row_size, col_size = shape
+    sentinel = row_size * col_size
+    index_dtype = np.int32 if sentinel <= np.iinfo(np.int32).max else np.int64
+    indices = np.arange(sentinel, dtype=index_dtype).reshape(shape)
+    padded = np.pad(indices, 1, constant_values=sentinel)
+    table = np.empty((sentinel, len(GRADIENTS)), dtype=index_dtype)
+    for k, (grad_r, grad_c) in enumerate(GRADIENTS):
+        table[:, k] = padded[1 + grad_r:1 + grad_r + row_size, 1 + grad_c:1 + grad_c + col_size].ravel()
+    return table
+
+
+def build_visible_table(is_seat: np.ndarray) -> np.ndarray:
+    """
+    Builds a line-of-sight table of shape (N, 8) where N is the number of locations in the area.
+    Row i of the table contains, for each of the gradients, the flat index of the first seat visible
+    from location i (flattened in row-major order), or N if no seats are visible that way.
+    """
+    sentinel = is_seat.size
+    index_dtype = np.int32 if sentinel <= np.iinfo(np.int32).max else np.int64
+    indices = np.arange(is_seat.size, dtype=index_dtype).reshape(is_seat.shape)
+    table = np.empty((is_seat.size, len(GRADIENTS)), dtype=index_dtype)
+    for k, (grad_r, grad_c) in enumerate(GRADIENTS):
+        if grad_r == 0:
+            # Sweeps through columns instead by working on the transposed area
+            nearest = trace_nearest_seats(is_seat.T, indices.T, grad_c, grad_r, sentinel).T
+        else:
+            nearest = trace_nearest_seats(is_seat, indices, grad_r, grad_c, sentinel)
+        table[:, k] = nearest.ravel()
+    return table
+
+
+def trace_nearest_seats(
+        is_seat: np.ndarray, indices: np.ndarray, grad_r: int, grad_c: int, sentinel: int,
+) -> np.ndarray:
+    """
+    Computes the index of the first seat visible from each location towards the given gradient
+    (which must have a non-zero row component). Rows are swept starting from the side
+    the gradient points to, so that the result for each row is derived from the row right ahead:
+    the location ahead if it is a seat, otherwise whatever is visible from the location ahead.
+    """
+    row_size = is_seat.shape[0]
+    nearest = np.full(is_seat.shape, sentinel, dtype=indices.dtype)
+    rows = range(row_size) if grad_r < 0 else reversed(range(row_size))
+    for r in rows:
+        ahead_r = r + grad_r
+        if not 0 <= ahead_r < row_size:
+            continue
+        seat_ahead = shift_row(is_seat[ahead_r], grad_c, fill=False)
+        index_ahead = shift_row(indices[ahead_r], grad_c, fill=sentinel)
+        nearest_ahead = shift_row(nearest[ahead_r], grad_c, fill=sentinel)
+        nearest[r] = np.where(seat_ahead, index_ahead, nearest_ahead)
+    return nearest
+
+
+def shift_row(row: np.ndarray, shift: int, fill) -> np.ndarray:
+    """
+    Creates a new row whose value at position c is taken from the given row at position c + shift,
+    or filled with the given value if such position is out of bounds.
+    """
+    shifted = np.full_like(row, fill)
+    if shift > 0:
+        shifted[:-shift] = row[shift:]
+    elif shift < 0:
+        shifted[-shift:] = row[:shift]
+    else:
+        shifted[:] = row
+    return shifted
+
+
+AnySeatMap = TypeVar('AnySeatMap', SeatMap, ArraySeatMap)
+
+
 def read_input_files(input_file: str) -> SeatMap:
     """
     Extracts a seating map.
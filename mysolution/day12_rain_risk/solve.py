@@ -3,7 +3,11 @@ from __future__ import annotations
 import enum
 import functools
 import os
-from typing import NamedTuple
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Literal, NamedTuple
+
+import numpy as np
 
 
 def main():
@@ -99,6 +103,170 @@ class Ship(NamedTuple):
         return self._replace(face_x=self.face_y, face_y=-self.face_x)
 
 
+NavigationMode = Literal['legacy', 'proper']
+
+# Affine transformations on ship states, represented as 5x5 matrices acting on
+# column vectors (pos_x, pos_y, face_x, face_y, 1)
+Matrix = tuple[tuple[int, ...], ...]
+IDENTITY: Matrix = tuple(tuple(int(r == c) for c in range(5)) for r in range(5))
+COMPASS_DIRECTIONS = {
+    Action.MOVE_NORTH: (0, 1),
+    Action.MOVE_SOUTH: (0, -1),
+    Action.MOVE_EAST: (1, 0),
+    Action.MOVE_WEST: (-1, 0),
+}
+
+
+def instruction_matrix(action: Action, value: int, mode: NavigationMode) -> Matrix:
+    """
+    Compiles a ship instruction into the affine transformation matrix which has the same effect
+    as `Ship.next_legacy_state` (legacy mode) or `Ship.next_proper_state` (proper mode).
+    """
+    matrix = [list(row) for row in IDENTITY]
+    if action in COMPASS_DIRECTIONS:
+        dx, dy = COMPASS_DIRECTIONS[action]
+        offset = 0 if mode == 'legacy' else 2
+        matrix[offset][4] = dx * value
+        matrix[offset + 1][4] = dy * value
+    elif action in (Action.TURN_LEFT, Action.TURN_RIGHT):
+        ticks = value // 90 if action == Action.TURN_LEFT else -(value // 90)
+        cos, sin = [(1, 0), (0, 1), (-1, 0), (0, -1)][ticks % 4]
+        matrix[2][2], matrix[2][3] = cos, -sin
+        matrix[3][2], matrix[3][3] = sin, cos
+    elif action == Action.MOVE_FORWARD:
+        matrix[0][2] = value
+        matrix[1][3] = value
+    else:
+        raise RuntimeError
+    return tuple(tuple(row) for row in matrix)
+
+
+def compose(first: Matrix, then: Matrix) -> Matrix:
+    """
+    Computes the matrix whose effect is applying the `first` matrix followed by the `then` matrix.
+    """
+    cols = list(zip(*first))
+    return tuple(
+        tuple(sum(a * b for a, b in zip(row, col)) for col in cols)
+        for row in then
+    )
+
+
+def transform(ship: Ship, matrix: Matrix) -> Ship:
+    vector = (*ship, 1)
+    return Ship(*(sum(a * b for a, b in zip(row, vector)) for row in matrix[:4]))
+
+
+@dataclass
+class NavigationLog:
+    """
+    Segment tree over the affine transformation matrices of a list of ship instructions.
+    It supports querying the combined effect of any contiguous range of instructions
+    as well as replacing a single instruction in O(log n) matrix compositions.
+    The tree is stored in the usual array layout where node i has children 2i and 2i+1
+    and the leaves are stored from position n onwards.
+    """
+    mode: NavigationMode
+    size: int
+    nodes: list[Matrix]
+
+    @classmethod
+    def from_instructions(cls, instructions: list[tuple[Action, int]], mode: NavigationMode) -> NavigationLog:
+        size = len(instructions)
+        nodes = [IDENTITY] * size + [instruction_matrix(action, value, mode) for action, value in instructions]
+        for i in reversed(range(1, size)):
+            nodes[i] = compose(nodes[2 * i], nodes[2 * i + 1])
+        return NavigationLog(mode, size, nodes)
+
+    def update(self, index: int, action: Action, value: int):
+        """
+        Replaces the instruction at the given index.
+        """
+        if not 0 <= index < self.size:
+            raise IndexError(f"instruction index out of range: {index}")
+        i = index + self.size
+        self.nodes[i] = instruction_matrix(action, value, self.mode)
+        while i > 1:
+            i //= 2
+            self.nodes[i] = compose(self.nodes[2 * i], self.nodes[2 * i + 1])
+
+    def effect(self, start: int, stop: int) -> Matrix:
+        """
+        Computes the combined transformation matrix of the instructions
+        from index start (inclusive) to stop (exclusive).
+        """
+        if not 0 <= start <= stop <= self.size:
+            raise ValueError(f"invalid range: [{start}, {stop})")
+        left_effect = right_effect = IDENTITY
+        lo, hi = start + self.size, stop + self.size
+        while lo < hi:
+            if lo & 1:
+                left_effect = compose(left_effect, self.nodes[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right_effect = compose(self.nodes[hi], right_effect)
+            lo //= 2
+            hi //= 2
+        return compose(left_effect, right_effect)
+
+    def state_after(self, ship: Ship, count: int) -> Ship:
+        """
+        Computes the state of the given ship after following the first `count` instructions.
+        """
+        return transform(ship, self.effect(0, count))
+
+
+ACTION_CODES = {action: code for code, action in enumerate(Action)}
+# Rotation matrices for 0, 1, 2, and 3 counterclockwise quarter turns
+QUARTER_ROTATIONS = np.array([[[1, 0], [0, 1]], [[0, -1], [1, 0]], [[-1, 0], [0, -1]], [[0, 1], [-1, 0]]])
+
+
+def simulate_ships(
+        instruction_lists: Sequence[list[tuple[Action, int]]], ships: Sequence[Ship], mode: NavigationMode,
+) -> np.ndarray:
+    """
+    Simulates many ships at once, each following its own list of instructions
+    (or all following the same list if only one list is given)
+    according to `Ship.next_legacy_state` (legacy mode) or `Ship.next_proper_state` (proper mode).
+    Each instruction step is applied to the array of all ship states simultaneously.
+    Instructions are decoded once per list, so a single shared list costs the same
+    regardless of the number of ships.
+    Returns the Manhattan distances of all ships from the origin after the simulation.
+    """
+    if len(instruction_lists) not in (1, len(ships)):
+        raise ValueError("expected either one instruction list or one instruction list per ship")
+
+    # Shorter instruction lists are padded with zero-unit north moves which are no-ops in both modes
+    length = max(len(instructions) for instructions in instruction_lists)
+    codes = np.full((len(instruction_lists), length), ACTION_CODES[Action.MOVE_NORTH], dtype=np.int8)
+    values = np.zeros((len(instruction_lists), length), dtype=np.int64)
+    for i, instructions in enumerate(instruction_lists):
+        codes[i, :len(instructions)] = [ACTION_CODES[action] for action, _ in instructions]
+        values[i, :len(instructions)] = [value for _, value in instructions]
+
+    # Decodes all instructions into compass displacements, rotation ticks, and forward distances,
+    # where the leading axis of a single shared list has size 1 and broadcasts over all ships in each step
+    units = np.zeros((len(Action), 2), dtype=np.int64)
+    for action, direction in COMPASS_DIRECTIONS.items():
+        units[ACTION_CODES[action]] = direction
+    displacements = units[codes] * values[..., np.newaxis]
+    ticks = np.select(
+        [codes == ACTION_CODES[Action.TURN_LEFT], codes == ACTION_CODES[Action.TURN_RIGHT]],
+        [values // 90, -(values // 90)],
+    ).astype(np.int8) % 4
+    forward_values = np.where(codes == ACTION_CODES[Action.MOVE_FORWARD], values, 0)[..., np.newaxis]
+
+    states = np.array(ships, dtype=np.int64).reshape(len(ships), 4)
+    positions, faces = states[:, :2], states[:, 2:]
+    moved = positions if mode == 'legacy' else faces
+    for t in range(length):
+        moved += displacements[:, t]
+        faces[:] = (QUARTER_ROTATIONS[ticks[:, t]] @ faces[..., np.newaxis])[..., 0]
+        positions += faces * forward_values[:, t]
+    return np.abs(positions).sum(axis=1)
+
+
 def read_input_files(input_file: str) -> list[tuple[Action, int]]:
     """
     Extracts a list of ship instructions.
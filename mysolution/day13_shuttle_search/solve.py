@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-import itertools
 import math
 import os
-from collections.abc import Iterator
-from typing import Optional
+from collections.abc import Iterable
+from typing import Literal, Optional
 
 Buses = list[Optional[int]]
 
@@ -34,7 +33,7 @@ def wait_time_until_next_bus(earliest_time: int, bus: int) -> int:
     return (-earliest_time) % bus
 
 
-def earliest_contest_event(buses: Buses) -> int:
+def earliest_contest_event(buses: Buses, method: Literal['merge', 'factorize'] = 'merge') -> int:
     """
     Computes the earliest timestamp T when the content happens.
     Specifically, for each bus B that has to depart from the bus stop
@@ -43,40 +42,71 @@ def earliest_contest_event(buses: Buses) -> int:
         T + D == 0  (mod B)
 
     In other words, T divided by B must yield a remainder in the same class as -D.
-    This function does the following:
-    - Extracts the preliminary chinese remainder theorem problem statement from the argument
-    - Prepares the problem statement so that all moduli are relatively prime
-    - Calls chinese remainder theorem algorithm to solve for answer
+    This function extracts the chinese remainder theorem problem statement from the argument
+    and then solves it with one of the following methods:
+    - 'merge': merges the congruences one by one (see `solve_congruences`)
+      which works directly with moduli that are not relatively prime
+    - 'factorize': prepares the problem statement so that all moduli are relatively prime
+      (by factorizing the moduli into prime powers)
+      and then calls chinese remainder theorem algorithm
     """
     prelim_qr_pairs = [(b, -i) for i, b in enumerate(buses) if b is not None]
-    max_q = max(q for q, _ in prelim_qr_pairs)
-
-    qr_pairs = []
-    for prime in generate_primes(limit=max_q):
-        power = max(largest_power_factor(q, prime) for q, _ in prelim_qr_pairs)
-        if power == 1:
-            continue
-        remainder = next(r % power for q, r in prelim_qr_pairs if q % power == 0)
-        qr_pairs.append((power, remainder))
-
-    return chinese_remainder(qr_pairs)
-
-
-def generate_primes(*, limit: int = None) -> Iterator[int]:
-    collected = []
-    for value in itertools.count(2):
-        if limit is not None and value > limit:
-            return
-        if all(value % p != 0 for p in collected):
-            collected.append(value)
-            yield value
-
-
-def largest_power_factor(value: int, base: int) -> int:
-    for count in itertools.count():
-        if value % base != 0:
-            return base ** count
-        value //= base
+    if method == 'merge':
+        _, remainder = solve_congruences(prelim_qr_pairs)
+        return remainder
+    elif method == 'factorize':
+        return chinese_remainder(coprime_congruences(prelim_qr_pairs))
+    else:
+        raise RuntimeError(f"unknown method {method!r}")
+
+
+def solve_congruences(qr_pairs: Iterable[tuple[int, int]]) -> tuple[int, int]:
+    """
+    Solves the system of congruences x == r (mod q) for all given pairs (q, r)
+    where the moduli q need not be relatively prime.
+    Returns the pair (L, x) where L is the least common multiple of all moduli
+    and x is the smallest non-negative solution (all solutions are congruent modulo L).
+    Raises ValueError if the system of congruences is inconsistent.
+    """
+    modulus, remainder = 1, 0
+    for q, r in qr_pairs:
+        modulus, remainder = merge_congruences(modulus, remainder, q, r)
+    return modulus, remainder
+
+
+def merge_congruences(q1: int, r1: int, q2: int, r2: int) -> tuple[int, int]:
+    """
+    Merges two congruences x == r1 (mod q1) and x == r2 (mod q2)
+    into a single congruence x == r (mod lcm(q1, q2)) and returns the pair (lcm(q1, q2), r).
+    Writing x = r1 + q1 * k, the second congruence becomes q1 * k == r2 - r1 (mod q2)
+    which is solvable if and only if g = gcd(q1, q2) divides r2 - r1,
+    in which case k == (r2 - r1) / g * inverse(q1 / g)  (mod q2 / g).
+    """
+    g = math.gcd(q1, q2)
+    diff = r2 - r1
+    if diff % g != 0:
+        raise ValueError(f"inconsistent congruences: x == {r1} (mod {q1}) and x == {r2} (mod {q2})")
+    reduced_q2 = q2 // g
+    k = diff // g * pow(q1 // g, -1, reduced_q2) % reduced_q2
+    lcm = q1 * reduced_q2
+    return lcm, (r1 + q1 * k) % lcm
+
+
+def coprime_congruences(qr_pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Transforms the system of congruences (q, r) into an equivalent one whose moduli are prime powers
+    (assuming that the system is consistent). For each prime, only the congruence modulo
+    the largest power of such prime dividing any of the moduli is kept.
+    The shared helper is only imported here so that `main` still runs as a plain script.
+    """
+    from mysolution.shared.numtheory import factorize
+    prime_power_pairs = {}
+    for q, r in qr_pairs:
+        for prime, exponent in factorize(q).items():
+            power = prime ** exponent
+            if power > prime_power_pairs.get(prime, (1, 0))[0]:
+                prime_power_pairs[prime] = (power, r % power)
+    return list(prime_power_pairs.values())
 
 
 def chinese_remainder(qr_pairs: list[tuple[int, int]]) -> int:
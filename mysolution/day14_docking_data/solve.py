@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import functools
 import os
 import re
-from collections.abc import Iterator
+from collections.abc import Callable
 from dataclasses import dataclass, field
-from typing import ClassVar, Literal, get_type_hints
+from typing import Any, ClassVar, Literal, NamedTuple, Optional, get_type_hints
+
+import numpy as np
+
+PREFIX_RE = re.compile(r'[a-z]+')
+ONES_TABLE = str.maketrans('01X', '010')
+ZEROS_TABLE = str.maketrans('01X', '100')
+FLOATING_TABLE = str.maketrans('01X', '001')
+
+INCLUSION_EXCLUSION_MAX_TERMS = 1024
+BITMAP_MAX_BITS = 24
+WORD_BITS = 6
+WORD_BIT_PATTERNS = [sum(1 << i for i in range(1 << WORD_BITS) if i >> j & 1) for j in range(WORD_BITS)]
 
 
 def main():
@@ -16,14 +29,14 @@ def main():
     program = Program(write_op_method='write_v1')
     for op in operations:
         program.execute(op)
-    p1_answer = sum(program.memory.values())
+    p1_answer = program.memory_sum()
     print(p1_answer)
 
     # Part 2
-    program = Program(write_op_method='write_v2')
+    program = Program(write_op_method='write_v2_symbolic')
     for op in operations:
         program.execute(op)
-    p2_answer = sum(program.memory.values())
+    p2_answer = program.memory_sum()
     print(p2_answer)
 
 
@@ -31,9 +44,11 @@ def main():
 class Program:
     """
     Represents a state of the program: current memory and mask.
+    Writes by the 'write_v2_symbolic' method are stored in `floating_memory` instead of `memory`.
     """
-    write_op_method: Literal['write_v1', 'write_v2']
+    write_op_method: Literal['write_v1', 'write_v2', 'write_v2_symbolic']
     memory: dict[int, int] = field(default_factory=dict)
+    floating_memory: FloatingMemory = field(default_factory=lambda: FloatingMemory())
     mask: MaskOp = None
 
     def execute(self, op: BaseOp):
@@ -48,38 +63,207 @@ class Program:
             raise RuntimeError
 
     def write_v1(self, write_op: WriteOp):
-        bitmask = int(self.mask.content.translate(str.maketrans('01X', '110')), base=2)
-        content = int(self.mask.content.translate(str.maketrans('01X', '010')), base=2)
-        merged_value = self.ternary_masking(bitmask, then_val=content, else_val=write_op.value)
-        self.memory[write_op.addr] = merged_value
+        self.memory[write_op.addr] = (write_op.value | self.mask.ones) & ~self.mask.zeros
 
     def write_v2(self, write_op: WriteOp):
-        bitmask = int(self.mask.content.translate(str.maketrans('01X', '011')), base=2)
-        for dyn_addr in self.generate_combinations(self.mask.content):
-            addr = self.ternary_masking(bitmask, then_val=dyn_addr, else_val=write_op.addr)
-            self.memory[addr] = write_op.value
+        """
+        Writes the value to all addresses where each floating bit can be either 0 or 1.
+        All such addresses are enumerated by iterating through all submasks of the floating bits.
+        """
+        floating = self.mask.floating
+        base_addr = (write_op.addr | self.mask.ones) & ~floating
+        submask = floating
+        while True:
+            self.memory[base_addr | submask] = write_op.value
+            if not submask:
+                break
+            submask = (submask - 1) & floating
 
-    @classmethod
-    def generate_combinations(cls, bit_string: str) -> Iterator[int]:
+    def write_v2_symbolic(self, write_op: WriteOp):
         """
-        Produces a sequence of all possible integers from the given `bit_string`
-        where each 'X' can be replaced by either '0' or '1'.
+        Same as `write_v2` but the write is stored symbolically as a single address pattern
+        instead of being expanded into all possible addresses.
         """
-        if 'X' in bit_string:
-            yield from cls.generate_combinations(bit_string.replace('X', '0', 1))
-            yield from cls.generate_combinations(bit_string.replace('X', '1', 1))
-        else:
-            yield int(bit_string, 2)
+        floating = self.mask.floating
+        pattern = AddressPattern(fixed=(write_op.addr | self.mask.ones) & ~floating, floating=floating)
+        self.floating_memory.write(pattern, write_op.value)
 
-    @classmethod
-    def ternary_masking(cls, cond: int, then_val: int, else_val: int) -> int:
+    def memory_sum(self) -> int:
         """
-        Computes an integer where each bit is taken from `then_val`
-        if the corresponding bit (i.e. at the same location) in `cond` is 1;
-        otherwise the bit value is taken from `else_val`.
+        Computes the sum of all values in the memory.
         """
-        inverted_cond = cond ^ ((1 << else_val.bit_length()) - 1)
-        return cond & then_val | inverted_cond & else_val
+        return sum(self.memory.values()) + self.floating_memory.total()
+
+
+class AddressPattern(NamedTuple):
+    """
+    Represents a set of memory addresses where the bits marked in `floating`
+    can be either 0 or 1, and all other bits must match those of `fixed`.
+    Floating bits in `fixed` are always 0.
+    """
+    fixed: int
+    floating: int
+
+    def size(self) -> int:
+        return 1 << bin(self.floating).count('1')
+
+    def overlaps(self, other: AddressPattern) -> bool:
+        return (self.fixed ^ other.fixed) & ~(self.floating | other.floating) == 0
+
+    def intersection(self, other: AddressPattern) -> AddressPattern:
+        """
+        Computes the pattern of addresses in both patterns, which must overlap.
+        """
+        floating = self.floating & other.floating
+        return AddressPattern((self.fixed | other.fixed) & ~floating, floating)
+
+
+@dataclass
+class FloatingMemory:
+    """
+    Memory whose content is stored as the list of writes (each as an address pattern
+    with the value stored at all of its addresses)
+    so that writes to exponentially many addresses take space proportional to the number of writes.
+
+    The total is computed by going through the writes backwards: each write contributes its value
+    at its addresses which are not overwritten by any later write (see `count_uncovered`).
+    Each write takes constant time, whereas the total takes quadratic time in the number of writes
+    to find overlapping patterns, plus the time of `count_uncovered` on the later patterns overlapping each write.
+    """
+    writes: list[tuple[AddressPattern, int]] = field(default_factory=list)
+
+    def write(self, pattern: AddressPattern, value: int):
+        self.writes.append((pattern, value))
+
+    def total(self) -> int:
+        """
+        Computes the sum of values over all written addresses.
+        """
+        total = 0
+        later_patterns = []
+        for pattern, value in reversed(self.writes):
+            constraints = [
+                (pattern.floating & ~p.floating, p.fixed & pattern.floating & ~p.floating)
+                for p in later_patterns if p.overlaps(pattern)
+            ]
+            total += value * count_uncovered(pattern.floating, constraints)
+            later_patterns.append(pattern)
+        return total
+
+
+def count_uncovered(free: int, constraints: list[tuple[int, int]]) -> int:
+    """
+    Counts the assignments of the free bits which satisfy none of the constraints,
+    where a constraint (mask, bits) is satisfied when the free bits in mask are set as in bits.
+    In `FloatingMemory`, these are the addresses of a pattern (whose floating bits are free)
+    which are not overwritten by any of the later overlapping patterns (each being a constraint).
+
+    The count is first attempted by inclusion-exclusion (see `union_size`), which is fast
+    as long as the constraints have few distinct intersections, and otherwise by a bitmap
+    (see `count_uncovered_by_bitmap`).
+    """
+    covered = union_size(
+        [AddressPattern(bits, free & ~mask) for mask, bits in constraints], max_terms=INCLUSION_EXCLUSION_MAX_TERMS,
+    )
+    if covered is not None:
+        return (1 << bin(free).count('1')) - covered
+    return count_uncovered_by_bitmap(free, constraints)
+
+
+def count_uncovered_by_bitmap(free: int, constraints: list[tuple[int, int]]) -> int:
+    """
+    Same as `count_uncovered` but only the constrained bits matter: the count is computed by marking
+    the assignments of those bits which satisfy each constraint in a bitmap (see `count_unmarked`),
+    which takes time proportional to the number of constraints times the size of each constraint in the bitmap.
+    If there are too many constrained bits for a bitmap, the bit shared by the most constraints
+    is fixed to either value and each half is counted separately.
+    """
+    constrained = 0
+    for mask, _ in constraints:
+        if not mask:
+            return 0
+        constrained |= mask
+    free_count = bin(free & ~constrained).count('1')
+    if bin(constrained).count('1') <= BITMAP_MAX_BITS:
+        return count_unmarked(constrained, constraints) << free_count
+
+    bit = max(bit_frequencies(constraints).items(), key=lambda item: item[1])[0]
+    return sum(
+        count_uncovered_by_bitmap(free & ~bit, [
+            (mask & ~bit, bits & ~bit)
+            for mask, bits in constraints
+            if not mask & bit or bits & bit == value
+        ])
+        for value in (0, bit)
+    )
+
+
+def count_unmarked(constrained: int, constraints: list[tuple[int, int]]) -> int:
+    """
+    Counts the assignments of the constrained bits which satisfy none of the constraints
+    using a bitmap of all such assignments, packed into 64-bit words.
+    The (up to 6) bits shared by the most constraints select the bit within each word,
+    so that each constraint marks the same word pattern over a strided view of the words.
+    The remaining bits index the words, with those shared by more constraints as the outer axes.
+    The newly marked assignments are counted as each constraint is marked.
+    """
+    frequencies = bit_frequencies(constraints)
+    bits_by_frequency = sorted(frequencies, key=frequencies.get, reverse=True)
+    word_bits, index_bits = bits_by_frequency[:WORD_BITS], bits_by_frequency[WORD_BITS:]
+    full_word = (1 << (1 << len(word_bits))) - 1
+    marked = np.zeros((2,) * len(index_bits) + (1,), dtype=np.uint64)
+    marked_count = 0
+    for mask, bits in constraints:
+        word = full_word
+        for pattern, bit in zip(WORD_BIT_PATTERNS, word_bits):
+            if mask & bit:
+                word &= pattern if bits & bit else ~pattern
+        view = marked[tuple((1 if bits & bit else 0) if mask & bit else slice(None) for bit in index_bits)]
+        word = np.uint64(word)
+        marked_count += int(np.count_nonzero(np.unpackbits((~view & word).view(np.uint8))))
+        view |= word
+    return (1 << bin(constrained).count('1')) - marked_count
+
+
+def bit_frequencies(constraints: list[tuple[int, int]]) -> dict[int, int]:
+    """
+    Counts the number of constraints which constrain each bit.
+    """
+    frequencies = {}
+    for mask, _ in constraints:
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            frequencies[bit] = frequencies.get(bit, 0) + 1
+    return frequencies
+
+
+def union_size(patterns: list[AddressPattern], max_terms: Optional[int] = None) -> Optional[int]:
+    """
+    Counts the addresses in any of the patterns by inclusion-exclusion,
+    or gives up and returns None once the number of weighted patterns exceeds max_terms (if given).
+    Signed weights are kept per distinct pattern: each new pattern gets weight +1, and its intersection
+    with every earlier weighted pattern gets the opposite weight so that overlaps are not double-counted.
+    Merging equal intersections and dropping zero weights keeps the number of weighted patterns
+    manageable in practice, although it can reach 2^n in the worst case
+    (counting the addresses in a union of such patterns is #P-hard in general).
+    """
+    # Same as `AddressPattern.overlaps` and `AddressPattern.intersection` on plain tuples, inlined for speed
+    weights = {}
+    for fixed, floating in patterns:
+        updates = {(fixed, floating): 1}
+        for (prev_fixed, prev_floating), weight in weights.items():
+            if (prev_fixed ^ fixed) & ~(prev_floating | floating) == 0:
+                common = prev_floating & floating
+                key = ((prev_fixed | fixed) & ~common, common)
+                updates[key] = updates.get(key, 0) - weight
+        for key, weight in updates.items():
+            weight += weights.pop(key, 0)
+            if weight:
+                weights[key] = weight
+        if max_terms is not None and len(weights) > max_terms:
+            return None
+    return sum(weight << bin(floating).count('1') for (_, floating), weight in weights.items())
 
 
 @dataclass
@@ -87,40 +271,67 @@ class BaseOp:
     """
     Base class for all operations in the docking program.
     """
-    subclasses: ClassVar[list[type[BaseOp]]] = []
+    subclasses: ClassVar[dict[str, type[BaseOp]]] = {}
+    prefix: ClassVar[str]
     pattern: ClassVar[re.Pattern[str]]
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
-        BaseOp.subclasses.append(cls)
+        BaseOp.subclasses[cls.prefix] = cls
 
     @classmethod
     def parse(cls, raw: str) -> BaseOp:
         """
         Parses an input raw string to an instance of `BaseOp` class.
-        This method uses the compiled regexp associated to each subclass
-        to determine which subclass whose instance should be constructed.
-        It also uses the value extracted from regexp to populate the attributes.
-        """
-        for subclass in cls.subclasses:
-            if matchobj := subclass.pattern.fullmatch(raw):
-                type_hints = get_type_hints(subclass)
-                data = {
-                    k: type_hints[k](v) if k in type_hints else v
-                    for k, v in matchobj.groupdict().items()
-                }
-                return subclass(**data)
+        This method uses the leading word of the raw string to determine
+        which subclass whose instance should be constructed.
+        It then uses the value extracted from regexp associated to such subclass
+        to populate the attributes.
+        """
+        prefix_matchobj = PREFIX_RE.match(raw)
+        subclass = prefix_matchobj and cls.subclasses.get(prefix_matchobj.group())
+        if subclass and (matchobj := subclass.pattern.fullmatch(raw)):
+            converters = subclass.field_converters()
+            data = {k: converters[k](v) for k, v in matchobj.groupdict().items()}
+            return subclass(**data)
         raise ValueError(f"unrecognized raw string: {raw}")
 
+    @classmethod
+    @functools.cache
+    def field_converters(cls) -> dict[str, Callable[[str], Any]]:
+        """
+        Obtains the function to convert each extracted string into the type of each attribute
+        (computed only once per subclass).
+        """
+        type_hints = get_type_hints(cls)
+        return {
+            k: type_hints.get(k, str)
+            for k in cls.pattern.groupindex
+        }
+
 
 @dataclass
 class MaskOp(BaseOp):
+    """
+    Mask operation whose content is also compiled into integer bitmasks
+    of the positions of 1s, 0s, and Xs in the mask.
+    """
+    prefix = 'mask'
     pattern = re.compile(r'mask = (?P<content>[01X]{36})')
     content: str
+    ones: int = field(init=False, repr=False)
+    zeros: int = field(init=False, repr=False)
+    floating: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.ones = int(self.content.translate(ONES_TABLE), base=2)
+        self.zeros = int(self.content.translate(ZEROS_TABLE), base=2)
+        self.floating = int(self.content.translate(FLOATING_TABLE), base=2)
 
 
 @dataclass
 class WriteOp(BaseOp):
+    prefix = 'mem'
     pattern = re.compile(r'mem\[(?P<addr>\d+)] = (?P<value>\d+)')
     addr: int
     value: int
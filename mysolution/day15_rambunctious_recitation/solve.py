@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import array
+import concurrent.futures
 import contextlib
+import hashlib
 import itertools
+import os
+import struct
 import time
-from collections.abc import Iterator
-
-import more_itertools
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
 
 
 def main():
@@ -15,13 +20,13 @@ def main():
     # Part 1
     target_pos = 2020
     with timer(message_prefix="timer: part 1 "):
-        p1_answer = more_itertools.nth(speak_numbers(start_numbers), n=target_pos - 1)
+        p1_answer = nth_spoken_number(start_numbers, target_pos)
     print(p1_answer)
 
     # Part 2
     target_pos = 30_000_000
     with timer(message_prefix="timer: part 2 "):
-        p2_answer = more_itertools.nth(speak_numbers(start_numbers), n=target_pos - 1)
+        p2_answer = nth_spoken_number(start_numbers, target_pos)
     print(p2_answer)
 
 
@@ -52,12 +57,255 @@ def speak_numbers(start_numbers: list[int]) -> Iterator[int]:
         yield value
 
 
+def nth_spoken_number(start_numbers: list[int], target_pos: int) -> int:
+    """
+    Computes the number spoken at the given (1-indexed) turn in a game
+    based on the given list of starting numbers.
+    This is equivalent to taking the corresponding element of `speak_numbers`
+    but runs much faster and more compactly (see `MemoryGame`).
+    """
+    assert start_numbers, "starting list cannot be empty"
+    if target_pos <= len(start_numbers):
+        return start_numbers[target_pos - 1]
+    game = MemoryGame.from_start_numbers(start_numbers, capacity=target_pos)
+    return game.advance_to(target_pos)
+
+
+def spoken_numbers_at(
+        start_numbers: list[int], target_positions: Iterable[int], store: Optional[CheckpointStore] = None,
+) -> dict[int, int]:
+    """
+    Computes the numbers spoken at each of the given (1-indexed) turns in a game
+    based on the given list of starting numbers, all within a single run of the game.
+    If a checkpoint store is given, the run resumes from the latest checkpoint
+    not beyond the earliest target turn.
+    """
+    assert start_numbers, "starting list cannot be empty"
+    target_positions = sorted(set(target_positions))
+    results = {pos: start_numbers[pos - 1] for pos in target_positions if pos <= len(start_numbers)}
+    remaining_positions = [pos for pos in target_positions if pos > len(start_numbers)]
+    if not remaining_positions:
+        return results
+
+    if store is not None:
+        game = store.nearest(start_numbers, remaining_positions[0])
+    else:
+        game = MemoryGame.from_start_numbers(start_numbers)
+    game.reserve(remaining_positions[-1])
+    for pos in remaining_positions:
+        results[pos] = game.advance_to(pos)
+    return results
+
+
+@dataclass
+class MemoryGame:
+    """
+    State of the memory game right after the number `value` is spoken at (1-indexed) `turn`.
+    The most recent turn of each spoken number (excluding the latest turn)
+    is kept in an array indexed by such number (where 0 means never spoken),
+    which is faster and far more compact than a dict.
+    This works because every spoken number after the starting numbers is less than the current turn.
+
+    Only the first `used_size` entries of the array can be nonzero, i.e. the starting numbers
+    and the numbers below the current turn, even if the array has been grown further in advance.
+
+    The state can be saved to a checkpoint file which consists of a fixed-size header
+    (see `CHECKPOINT_HEADER`) followed by the used part of the array of most recent turns
+    as native uint32 integers, so that the array can also be memory-mapped directly, e.g. with
+    `numpy.memmap(path, dtype=numpy.uint32, offset=CHECKPOINT_HEADER.size)`.
+    """
+    turn: int
+    value: int
+    recent_turns: array.array
+    used_size: int
+
+    @classmethod
+    def from_start_numbers(cls, start_numbers: list[int], capacity: int = 0) -> MemoryGame:
+        assert start_numbers, "starting list cannot be empty"
+        capacity = max(capacity, len(start_numbers), max(start_numbers) + 1)
+        recent_turns = array.array('I', [0]) * capacity
+        for turn, value in enumerate(start_numbers[:-1], start=1):
+            recent_turns[value] = turn
+        used_size = max(len(start_numbers), max(start_numbers) + 1)
+        return MemoryGame(len(start_numbers), start_numbers[-1], recent_turns, used_size)
+
+    def reserve(self, capacity: int):
+        """
+        Grows the array of most recent turns to accommodate games up to the given turn.
+        """
+        if len(self.recent_turns) < capacity:
+            self.recent_turns.extend(array.array('I', [0]) * (capacity - len(self.recent_turns)))
+
+    def advance_to(self, target_pos: int) -> int:
+        """
+        Continues the game up to the given (1-indexed) turn and returns the number spoken at such turn.
+        """
+        if target_pos < self.turn:
+            raise ValueError(f"cannot go back from turn {self.turn} to turn {target_pos}")
+        self.reserve(target_pos)
+        recent_turns = self.recent_turns
+        value = self.value
+        for turn in range(self.turn, target_pos):
+            recent_turn = recent_turns[value]
+            recent_turns[value] = turn
+            value = turn - recent_turn if recent_turn else 0
+        self.turn, self.value = target_pos, value
+        self.used_size = max(self.used_size, target_pos)
+        return value
+
+    def save(self, checkpoint_file: str):
+        """
+        Saves the state to the checkpoint file, where only the used part of the array is written.
+        """
+        with open(checkpoint_file, 'wb') as fobj:
+            fobj.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, self.turn, self.value, self.used_size))
+            fobj.write(memoryview(self.recent_turns)[:self.used_size])
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> MemoryGame:
+        with open(checkpoint_file, 'rb') as fobj:
+            magic, turn, value, size = CHECKPOINT_HEADER.unpack(fobj.read(CHECKPOINT_HEADER.size))
+            if magic != CHECKPOINT_MAGIC:
+                raise ValueError(f"not a memory game checkpoint file: {checkpoint_file}")
+            recent_turns = array.array('I')
+            recent_turns.fromfile(fobj, size)
+        return MemoryGame(turn, value, recent_turns, size)
+
+
+CHECKPOINT_MAGIC = b'VANECK01'
+CHECKPOINT_HEADER = struct.Struct('=8sQQQ')
+
+
+@dataclass
+class CheckpointStore:
+    """
+    Directory of memory game checkpoint files, which are named after
+    the digest of the starting numbers and the turn of the checkpoint.
+    """
+    directory: str
+
+    def checkpoint_file(self, start_numbers: list[int], turn: int) -> str:
+        return os.path.join(self.directory, f"{self.game_key(start_numbers)}-{turn:012d}.vaneck")
+
+    @classmethod
+    def game_key(cls, start_numbers: list[int]) -> str:
+        return hashlib.sha1(','.join(map(str, start_numbers)).encode()).hexdigest()[:16]
+
+    def checkpoint_turns(self, start_numbers: list[int]) -> list[int]:
+        """
+        Lists the turns of all saved checkpoints of the game in increasing order.
+        """
+        prefix = f"{self.game_key(start_numbers)}-"
+        with contextlib.suppress(FileNotFoundError):
+            return sorted(
+                int(filename[len(prefix):-len('.vaneck')])
+                for filename in os.listdir(self.directory)
+                if filename.startswith(prefix) and filename.endswith('.vaneck')
+            )
+        return []
+
+    def save(self, start_numbers: list[int], game: MemoryGame):
+        os.makedirs(self.directory, exist_ok=True)
+        game.save(self.checkpoint_file(start_numbers, game.turn))
+
+    def nearest(self, start_numbers: list[int], target_pos: int) -> MemoryGame:
+        """
+        Loads the game from the latest checkpoint which is not beyond the given turn,
+        or starts a new game if there are no such checkpoints.
+        """
+        turns = [t for t in self.checkpoint_turns(start_numbers) if t <= target_pos]
+        if turns:
+            return MemoryGame.load(self.checkpoint_file(start_numbers, turns[-1]))
+        return MemoryGame.from_start_numbers(start_numbers)
+
+    def seek(self, start_numbers: list[int], target_pos: int, interval: Optional[int] = None) -> int:
+        """
+        Computes the number spoken at the given (1-indexed) turn by resuming from the nearest checkpoint.
+        If interval is given, new checkpoints are saved at every multiple of such interval along the way.
+        """
+        if target_pos <= len(start_numbers):
+            return start_numbers[target_pos - 1]
+        game = self.nearest(start_numbers, target_pos)
+        game.reserve(target_pos)
+        if interval is not None:
+            for checkpoint_pos in range((game.turn // interval + 1) * interval, target_pos + 1, interval):
+                game.advance_to(checkpoint_pos)
+                self.save(start_numbers, game)
+        return game.advance_to(target_pos)
+
+
+def play_games_in_parallel(
+        games: Iterable[tuple[list[int], int]], memory_limit: int, max_workers: Optional[int] = None,
+) -> Iterator[GameResult]:
+    """
+    Computes the numbers spoken at the target turns of many games, each given as
+    a pair of the list of starting numbers and the (1-indexed) target turn,
+    by scheduling the games across a pool of worker processes.
+    A game is only started when the estimated memory of all running games
+    (the target turn times the bytes per entry in `MemoryGame`) stays within the memory limit,
+    except that a single game is always allowed to run.
+    Results are produced as soon as each game finishes, which may be out of order.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    games = iter(games)
+    next_game = next(games, None)
+    running = {}
+    reserved_memory = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        while next_game is not None or running:
+            while next_game is not None and len(running) < max_workers:
+                required_memory = estimate_game_memory(*next_game)
+                if running and reserved_memory + required_memory > memory_limit:
+                    break
+                running[executor.submit(play_game, *next_game)] = required_memory
+                reserved_memory += required_memory
+                next_game = next(games, None)
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                reserved_memory -= running.pop(future)
+                yield future.result()
+
+
+class GameResult(NamedTuple):
+    start_numbers: list[int]
+    target_pos: int
+    value: int
+    duration: float
+
+
+def play_game(start_numbers: list[int], target_pos: int) -> GameResult:
+    with timer(message_prefix=None) as elapsed:
+        value = nth_spoken_number(start_numbers, target_pos)
+    return GameResult(start_numbers, target_pos, value, elapsed.duration)
+
+
+def estimate_game_memory(start_numbers: list[int], target_pos: int) -> int:
+    """
+    Estimates the number of bytes required by the array of most recent turns in `MemoryGame`.
+    """
+    capacity = max(target_pos, len(start_numbers), max(start_numbers) + 1)
+    return capacity * array.array('I').itemsize
+
+
+@dataclass
+class Elapsed:
+    duration: float = 0.0
+
+
 @contextlib.contextmanager
-def timer(message_prefix: str = ""):
+def timer(message_prefix: Optional[str] = ""):
+    """
+    Measures the duration of the code block, which is made available
+    through the yielded object after the block ends.
+    The duration is also printed unless message_prefix is None.
+    """
+    elapsed = Elapsed()
     start_time = time.perf_counter()
-    yield
-    duration = time.perf_counter() - start_time
-    print(f"{message_prefix}took {duration:.4f}s")
+    yield elapsed
+    elapsed.duration = time.perf_counter() - start_time
+    if message_prefix is not None:
+        print(f"{message_prefix}took {elapsed.duration:.4f}s")
 
 
 if __name__ == '__main__':
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
+import collections
 import math
 import os
-from collections.abc import Callable, Iterable
 from dataclasses import dataclass
-from typing import TypeVar, cast
+from typing import Optional, cast
 
 import more_itertools
-
-T = TypeVar('T')
+import numpy as np
 
 
 def main():
@@ -17,11 +16,14 @@ def main():
     rules, my_ticket, nearby_tickets = read_input_files(input_file)
 
     # Part 1
-    p1_answer = sum(sum(ticket_errors(tix, rules)) for tix in nearby_tickets)
+    rule_index = RuleIndex.from_rules(rules)
+    nearby_matrix = tickets_to_matrix(nearby_tickets)
+    is_invalid = rule_index.invalid_mask(nearby_matrix)
+    p1_answer = int(nearby_matrix[is_invalid].sum())
     print(p1_answer)
 
     # Part 2
-    nearby_tickets = [tix for tix in nearby_tickets if not ticket_errors(tix, rules)]
+    nearby_tickets = [tix for tix, row in zip(nearby_tickets, is_invalid) if not row.any()]
     matched_columns = resolve_attributes(rules, nearby_tickets)
     relevant_attrs = [
         my_ticket.attrs[mc]
@@ -67,37 +69,170 @@ def ticket_errors(ticket: Ticket, rules: list[Rule]) -> list[int]:
     ]
 
 
-def resolve_attributes(rules: list[Rule], tickets: list[Ticket]) -> list[int]:
-    # For each rule r at position r_index,
-    # candidates[r_index] stores a list of column indices
-    # where values of such column in all tickets satisfies the rule r
-    candidate_sets = [
-        {
-            col for col, _ in enumerate(rules)
-            if all(tix.attrs[col] in r for tix in tickets)
-        }
-        for r in rules
-    ]
+@dataclass
+class RuleIndex:
+    """
+    Precompiled lookup structure for a list of rules.
+    - `intervals`: sorted disjoint ranges covering all values satisfying at least one rule
+    - `valid_values`: a dense boolean array over the value domain (from 0 up to the largest upper bound)
+      indicating whether each value satisfies at least one rule
+    - `rule_masks`: a dense array of bitmasks over the value domain, where bit r (little-endian,
+      packed into bytes) of the bitmask at each value indicates whether such value satisfies rule r
+    """
+    num_rules: int
+    intervals: list[range]
+    valid_values: np.ndarray
+    rule_masks: np.ndarray
+
+    @classmethod
+    def from_rules(cls, rules: list[Rule]) -> RuleIndex:
+        all_ranges = sorted((rg for r in rules for rg in r.ranges), key=lambda rg: rg.start)
+        intervals = []
+        for rg in all_ranges:
+            if intervals and rg.start <= intervals[-1].stop:
+                intervals[-1] = range(intervals[-1].start, max(intervals[-1].stop, rg.stop))
+            else:
+                intervals.append(rg)
+
+        domain_size = max((rg.stop for rg in all_ranges), default=0)
+        valid_values = np.zeros(domain_size, dtype=bool)
+        for rg in intervals:
+            valid_values[rg.start:rg.stop] = True
+        satisfied = np.zeros((domain_size, len(rules)), dtype=bool)
+        for r_index, r in enumerate(rules):
+            for rg in r.ranges:
+                satisfied[rg.start:rg.stop, r_index] = True
+        rule_masks = np.packbits(satisfied, axis=1, bitorder='little')
+        return RuleIndex(len(rules), intervals, valid_values, rule_masks)
 
-    # Assuming that the final solution is unique,
-    # uses the process of elimination to match rules with columns
-    matched_columns = [None for _ in rules]
-    for _ in rules:
-        index, cs = find_with_index(candidate_sets, lambda cs_: len(cs_) == 1)
-        col = cs.pop()
-        for other_cs in candidate_sets:
-            other_cs.discard(col)
-        matched_columns[index] = col
-
-    assert all(isinstance(mc, int) for mc in matched_columns)
+    def __contains__(self, value: int) -> bool:
+        return 0 <= value < len(self.valid_values) and bool(self.valid_values[value])
+
+    def satisfied_rules(self, value: int) -> list[int]:
+        """
+        Lists the indices of all rules which the given value satisfies.
+        """
+        if not 0 <= value < len(self.valid_values):
+            return []
+        bits = np.unpackbits(self.rule_masks[value], count=self.num_rules, bitorder='little')
+        return np.flatnonzero(bits).tolist()
+
+    def ticket_errors(self, ticket: Ticket) -> list[int]:
+        """
+        Same as `ticket_errors` but using a single array lookup per attribute.
+        """
+        return [attr for attr in ticket.attrs if attr not in self]
+
+    def invalid_mask(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Computes a boolean array of the same shape as the given array of ticket attributes
+        (see `tickets_to_matrix`) indicating which attributes do not satisfy any rules.
+        """
+        in_domain = (matrix >= 0) & (matrix < len(self.valid_values))
+        is_valid = np.zeros(matrix.shape, dtype=bool)
+        is_valid[in_domain] = self.valid_values[matrix[in_domain]]
+        return ~is_valid
+
+
+def tickets_to_matrix(tickets: list[Ticket]) -> np.ndarray:
+    """
+    Combines the attributes of all tickets into a 2D array, one ticket per row.
+    """
+    return np.array([tix.attrs for tix in tickets], dtype=np.int64).reshape(len(tickets), -1)
+
+
+def resolve_attributes(rules: list[Rule], tickets: list[Ticket]) -> list[int]:
+    """
+    Matches each rule with a column of ticket attributes
+    such that values of such column in all tickets satisfy the rule.
+    Returns the matched column index for each rule.
+    Assuming that the final solution is unique, any perfect matching is the solution.
+    """
+    candidates = candidate_matrix(rules, tickets_to_matrix(tickets))
+    adjacency = [np.flatnonzero(row).tolist() for row in candidates]
+    matched_columns = hopcroft_karp(adjacency, num_right=candidates.shape[1])
+    if any(mc is None for mc in matched_columns):
+        raise ValueError("cannot match every rule with a distinct column")
     return cast(list[int], matched_columns)
 
 
-def find_with_index(iterable: Iterable[T], pred: Callable[[T], bool]) -> tuple[int, T]:
-    for index, value in enumerate(iterable):
-        if pred(value):
-            return index, value
-    raise ValueError("no value in the sequence satisfies the predicate")
+def candidate_matrix(rules: list[Rule], matrix: np.ndarray) -> np.ndarray:
+    """
+    Computes a boolean array of shape (number of rules, number of columns)
+    indicating whether values of each column in all tickets (see `tickets_to_matrix`) satisfy each rule.
+    """
+    candidates = np.empty((len(rules), matrix.shape[1]), dtype=bool)
+    for r_index, r in enumerate(rules):
+        satisfied = np.zeros(matrix.shape, dtype=bool)
+        for rg in r.ranges:
+            satisfied |= (rg.start <= matrix) & (matrix < rg.stop)
+        candidates[r_index] = satisfied.all(axis=0)
+    return candidates
+
+
+def hopcroft_karp(adjacency: list[list[int]], num_right: int) -> list[Optional[int]]:
+    """
+    Finds a maximum matching in a bipartite graph using Hopcroft-Karp algorithm
+    in O(E sqrt(V)) running time, where adjacency[u] lists the right vertices adjacent to left vertex u.
+    Returns the matched right vertex for each left vertex (or None if unmatched).
+    Each phase finds the shortest augmenting path length with a breadth-first search
+    from all free left vertices, then augments along a maximal set of disjoint shortest paths
+    with depth-first searches restricted to the layers found.
+    """
+    match_left: list[Optional[int]] = [None for _ in adjacency]
+    match_right: list[Optional[int]] = [None for _ in range(num_right)]
+
+    while True:
+        layers: list[Optional[int]] = [0 if mc is None else None for mc in match_left]
+        queue = collections.deque(u for u, layer in enumerate(layers) if layer is not None)
+        found_free_right = False
+        while queue:
+            u = queue.popleft()
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w is None:
+                    found_free_right = True
+                elif layers[w] is None:
+                    layers[w] = layers[u] + 1
+                    queue.append(w)
+        if not found_free_right:
+            return match_left
+        for u, mc in enumerate(match_left):
+            if mc is None:
+                augment(u, adjacency, layers, match_left, match_right)
+
+
+def augment(
+        root: int, adjacency: list[list[int]], layers: list[Optional[int]],
+        match_left: list[Optional[int]], match_right: list[Optional[int]],
+) -> bool:
+    """
+    Searches for an augmenting path from the free left vertex along the layers of `hopcroft_karp`
+    and flips the matching along such path if found,
+    with an explicit stack (of each left vertex with its remaining edges) so that long paths
+    do not hit the recursion limit. Dead-end vertices are removed from the layers.
+    """
+    stack = [(root, iter(adjacency[root]))]
+    path = []
+    while stack:
+        u, edges = stack[-1]
+        for v in edges:
+            w = match_right[v]
+            if w is None:
+                path.append(v)
+                for (x, _), y in zip(stack, path):
+                    match_left[x], match_right[y] = y, x
+                return True
+            if layers[w] == layers[u] + 1:
+                path.append(v)
+                stack.append((w, iter(adjacency[w])))
+                break
+        else:
+            layers[u] = None
+            stack.pop()
+            if path:
+                path.pop()
+    return False
 
 
 def read_input_files(input_file: str) -> tuple[list[Rule], Ticket, list[Ticket]]:
@@ -3,9 +3,12 @@ from __future__ import annotations
 import collections
 import functools
 import itertools
+import math
 import os
 from collections.abc import Iterator, Set
 
+import numpy as np
+
 IntTuple = tuple[int, ...]
 
 
@@ -15,29 +18,50 @@ def main():
     initial_pocket = read_input_files(input_file)
 
     # Part 1
-    initial_pocket_3d = {c + (0,) for c in initial_pocket}
-    result_pocket = functools.reduce(lambda p, _: expand_once(p), range(6), initial_pocket_3d)
-    p1_answer = len(result_pocket)
+    initial_grid_3d = pocket_to_grid({c + (0,) for c in initial_pocket})
+    result_grid = functools.reduce(lambda g, _: expand_grid_once(g), range(6), initial_grid_3d)
+    p1_answer = int(result_grid.sum())
     print(p1_answer)
 
     # Part 2
-    initial_pocket_4d = {c + (0, 0) for c in initial_pocket}
-    result_pocket = functools.reduce(lambda p, _: expand_once(p), range(6), initial_pocket_4d)
-    p2_answer = len(result_pocket)
+    initial_grid_4d = pocket_to_grid({c + (0, 0) for c in initial_pocket})
+    result_grid = functools.reduce(lambda g, _: expand_grid_once(g), range(6), initial_grid_4d)
+    p2_answer = int(result_grid.sum())
     print(p2_answer)
 
 
-def expand_once(pocket: Set[IntTuple]) -> frozenset[IntTuple]:
+def expand_once(pocket: Set[IntTuple], num_extra_dims: int = 0) -> frozenset[IntTuple]:
     """
     Expands the current state of pocket
     (provided as a collection of active cube coordinates)
     into the next state according to the Conway-style rules.
+
+    If num_extra_dims is positive, the last such number of coordinates are extra dimensions
+    in which the pocket is symmetric (i.e. invariant under negating any extra coordinate
+    and under permuting the extra coordinates among themselves), which holds
+    when the initial pocket has all extra coordinates set to zero.
+    In this mode, the pocket only stores the canonical cubes (see `canonicalize`)
+    with each representing its whole orbit under such symmetries (see `orbit_size`).
+    The number of active neighbors of each canonical cube is recovered
+    by weighting each neighbor contribution by the orbit size of the contributing cube,
+    then dividing by the orbit size of the receiving cube.
     """
-    active_neighbor_counts = collections.Counter(
-        neighbor_coords
-        for coords in pocket
-        for neighbor_coords in generate_neighbors(coords)
-    )
+    if not num_extra_dims:
+        active_neighbor_counts = collections.Counter(
+            neighbor_coords
+            for coords in pocket
+            for neighbor_coords in generate_neighbors(coords)
+        )
+    else:
+        weighted_neighbor_counts = collections.Counter()
+        for coords in pocket:
+            multiplicity = orbit_size(coords, num_extra_dims)
+            for neighbor_coords in generate_neighbors(coords):
+                weighted_neighbor_counts[canonicalize(neighbor_coords, num_extra_dims)] += multiplicity
+        active_neighbor_counts = {
+            coords: weighted_count // orbit_size(coords, num_extra_dims)
+            for coords, weighted_count in weighted_neighbor_counts.items()
+        }
     next_pocket = frozenset(
         coords for coords, count in active_neighbor_counts.items()
         if coords in pocket and count == 2 or count == 3
@@ -45,6 +69,46 @@ def expand_once(pocket: Set[IntTuple]) -> frozenset[IntTuple]:
     return next_pocket
 
 
+def canonicalize(coords: IntTuple, num_extra_dims: int) -> IntTuple:
+    """
+    Maps the cube coordinates to the canonical representative of its orbit
+    where the extra coordinates are non-negative and sorted in increasing order.
+    """
+    split = len(coords) - num_extra_dims
+    return coords[:split] + tuple(sorted(abs(c) for c in coords[split:]))
+
+
+def orbit_size(coords: IntTuple, num_extra_dims: int) -> int:
+    """
+    Counts the number of distinct cubes obtainable from the given cube coordinates
+    by negating and permuting the extra coordinates (see `extra_orbit_size`).
+    """
+    return extra_orbit_size(tuple(sorted(abs(c) for c in coords[len(coords) - num_extra_dims:])))
+
+
+@functools.lru_cache(maxsize=None)
+def extra_orbit_size(extra_coords: IntTuple) -> int:
+    """
+    Counts the orbit size given the absolute extra coordinates in sorted order:
+    two choices of signs per non-zero extra coordinate times
+    the number of distinct permutations of the extra coordinates.
+    The cache is keyed only on the extra coordinates so it stays small
+    no matter how many cubes are visited.
+    """
+    num_permutations = math.factorial(len(extra_coords))
+    for repeats in collections.Counter(extra_coords).values():
+        num_permutations //= math.factorial(repeats)
+    return 2 ** sum(c != 0 for c in extra_coords) * num_permutations
+
+
+def count_active(pocket: Set[IntTuple], num_extra_dims: int = 0) -> int:
+    """
+    Counts the number of active cubes in the pocket,
+    taking into account the orbit represented by each canonical cube (see `expand_once`).
+    """
+    return sum(orbit_size(coords, num_extra_dims) for coords in pocket)
+
+
 def generate_neighbors(coords: IntTuple) -> Iterator[IntTuple]:
     dim = len(coords)
     deltas = (-1, 0, 1)
@@ -55,6 +119,53 @@ def generate_neighbors(coords: IntTuple) -> Iterator[IntTuple]:
         yield shifted_coords
 
 
+def pocket_to_grid(pocket: Set[IntTuple]) -> np.ndarray:
+    """
+    Converts the pocket (provided as a collection of active cube coordinates)
+    into a dense boolean array spanning the bounding box of all active cubes.
+    """
+    dim = len(next(iter(pocket)))
+    lower = [min(coords[axis] for coords in pocket) for axis in range(dim)]
+    upper = [max(coords[axis] for coords in pocket) for axis in range(dim)]
+    grid = np.zeros([hi - lo + 1 for lo, hi in zip(lower, upper)], dtype=bool)
+    grid[tuple(np.array(list(pocket)).T - np.array(lower)[:, np.newaxis])] = True
+    return grid
+
+
+def expand_grid_once(grid: np.ndarray) -> np.ndarray:
+    """
+    Same as `expand_once` but operates on the pocket as a dense boolean array of any dimension.
+    The array is padded by one cell on each side so that the pocket can grow,
+    then the number of active cubes in each 3x3x...x3 box is computed as a separable sum
+    of three shifted slices along each axis in turn.
+    The result is cropped to the bounding box of the active cubes.
+    """
+    grid = np.pad(grid, 1)
+    counts = grid.astype(np.min_scalar_type(3 ** grid.ndim))
+    for axis in range(grid.ndim):
+        padded = np.pad(counts, [(1, 1) if a == axis else (0, 0) for a in range(grid.ndim)])
+        counts = sum(
+            padded[tuple(slice(shift, shift + grid.shape[a]) if a == axis else slice(None) for a in range(grid.ndim))]
+            for shift in range(3)
+        )
+    counts -= grid
+    return crop_to_active((counts == 3) | grid & (counts == 2))
+
+
+def crop_to_active(grid: np.ndarray) -> np.ndarray:
+    """
+    Crops the boolean array to the bounding box of its true cells.
+    """
+    if not grid.any():
+        return np.zeros((0,) * grid.ndim, dtype=bool)
+    bounds = []
+    for axis in range(grid.ndim):
+        other_axes = tuple(a for a in range(grid.ndim) if a != axis)
+        indices = np.flatnonzero(grid.any(axis=other_axes))
+        bounds.append(slice(indices[0], indices[-1] + 1))
+    return grid[tuple(bounds)]
+
+
 def read_input_files(input_file: str) -> frozenset[IntTuple]:
     """
     Extracts an initial pocket dimension
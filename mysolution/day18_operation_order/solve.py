@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import functools
+import operator
 import os
+import re
+from collections.abc import Callable, Iterator
+from typing import Literal, NamedTuple
 
 from lark import Lark, Transformer, v_args
 
@@ -53,16 +58,125 @@ def main():
     expressions = read_input_files(input_file)
 
     # Part 1
-    add_mul_eq_parser = Lark(ADD_MUL_EQ_GRAMMAR, start='expr', parser='lalr', transformer=TreeEvaluator())
-    p1_answer = sum(add_mul_eq_parser.parse(expr) for expr in expressions)
+    p1_answer = sum(evaluate(expr, ADD_MUL_EQ_TABLE) for expr in expressions)
     print(p1_answer)
 
     # Part 2
-    add_b4_mul_parser = Lark(ADD_B4_MUL_GRAMMAR, start='factor', parser='lalr', transformer=TreeEvaluator())
-    p2_answer = sum(add_b4_mul_parser.parse(expr) for expr in expressions)
+    p2_answer = sum(evaluate(expr, ADD_B4_MUL_TABLE) for expr in expressions)
     print(p2_answer)
 
 
+def build_parser(grammar: str, start: str, **cache_options) -> Lark:
+    """
+    Builds an LALR parser from one of the grammars above
+    which evaluates each expression into an integer while parsing
+    (this is an alternative to `evaluate` for the predefined precedence rules).
+    The parser is loaded from the on-disk cache if it has been built before
+    (the cache options, e.g. `cache_dir`, are passed to `cached_parser`).
+    The shared cache module is only imported here so that `main` still runs as a plain script.
+    """
+    from mysolution.shared.lark_cache import cached_parser
+    return cached_parser(grammar, start=start, parser='lalr', transformer=TreeEvaluator(), **cache_options)
+
+
+class Operator(NamedTuple):
+    precedence: int
+    associativity: Literal['left', 'right']
+    func: Callable[[int, int], int]
+
+
+PrecedenceTable = dict[str, Operator]
+
+ADD_MUL_EQ_TABLE: PrecedenceTable = {
+    '+': Operator(precedence=1, associativity='left', func=operator.add),
+    '*': Operator(precedence=1, associativity='left', func=operator.mul),
+}
+
+ADD_B4_MUL_TABLE: PrecedenceTable = {
+    '+': Operator(precedence=2, associativity='left', func=operator.add),
+    '*': Operator(precedence=1, associativity='left', func=operator.mul),
+}
+
+
+def evaluate(expr: str, table: PrecedenceTable) -> int:
+    """
+    Evaluates an expression of integers, parentheses, and binary operators
+    whose precedence and associativity are given by the table.
+    This function implements the shunting-yard algorithm which evaluates in a single pass
+    without building a parse tree: each operator waits on the stack until an operator of lower
+    precedence (or of equal precedence, if left-associative) or a closing parenthesis arrives.
+    """
+    values = []
+    pending_ops = []
+    for token in tokenize(expr, table):
+        if token[0].isdigit():
+            values.append(int(token))
+        elif token == '(':
+            pending_ops.append(token)
+        elif token == ')':
+            if not reduce_until_open_paren(values, pending_ops, table):
+                raise ValueError(f"unbalanced parentheses: {expr}")
+            pending_ops.pop()
+        else:
+            op = table[token]
+            while pending_ops and pending_ops[-1] != '(' and binds_first(table[pending_ops[-1]], op):
+                reduce_top(values, pending_ops, table)
+            pending_ops.append(token)
+
+    if reduce_until_open_paren(values, pending_ops, table):
+        raise ValueError(f"unbalanced parentheses: {expr}")
+    if len(values) != 1:
+        raise ValueError(f"malformed expression: {expr}")
+    return values[0]
+
+
+def reduce_top(values: list[int], pending_ops: list[str], table: PrecedenceTable):
+    """
+    Applies the operator at the top of the stack to the top two values.
+    """
+    if len(values) < 2:
+        raise ValueError(f"missing operand for operator {pending_ops[-1]!r}")
+    right, left = values.pop(), values.pop()
+    values.append(table[pending_ops.pop()].func(left, right))
+
+
+def reduce_until_open_paren(values: list[int], pending_ops: list[str], table: PrecedenceTable) -> bool:
+    """
+    Applies operators from the top of the stack until an opening parenthesis is reached.
+    Returns whether such opening parenthesis exists.
+    """
+    while pending_ops and pending_ops[-1] != '(':
+        reduce_top(values, pending_ops, table)
+    return bool(pending_ops)
+
+
+def binds_first(prev_op: Operator, next_op: Operator) -> bool:
+    """
+    Determines whether the preceding operator should be applied before the next operator.
+    """
+    if prev_op.precedence == next_op.precedence:
+        return next_op.associativity == 'left'
+    return prev_op.precedence > next_op.precedence
+
+
+def tokenize(expr: str, table: PrecedenceTable) -> Iterator[str]:
+    """
+    Splits the expression into integers, parentheses, and operators in the table,
+    ignoring whitespaces.
+    """
+    for matchobj in token_pattern(tuple(table)).finditer(expr):
+        if matchobj.lastgroup == 'invalid':
+            raise ValueError(f"unexpected character {matchobj.group('invalid')!r} in expression: {expr}")
+        yield matchobj.group(matchobj.lastgroup)
+
+
+@functools.lru_cache(maxsize=None)
+def token_pattern(symbols: tuple[str, ...]) -> re.Pattern[str]:
+    # Longer operator symbols are tried first so that they are not split into shorter ones
+    operators = '|'.join(re.escape(sym) for sym in sorted(symbols, key=len, reverse=True))
+    return re.compile(rf'\s*(?:(?P<number>\d+)|(?P<paren>[()])|(?P<operator>{operators})|(?P<invalid>\S))')
+
+
 def read_input_files(input_file: str) -> list[str]:
     """
     Extracts a list of expressions.
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import math
 import os
 import re
+from dataclasses import dataclass, field
+from typing import Optional, Union
 
 import more_itertools
 from lark import Lark, LarkError
@@ -22,20 +25,142 @@ def main():
     this_dir = os.path.dirname(os.path.abspath(__file__))
     input_file = os.path.join(this_dir, 'input.txt')
     rules, messages = read_input_files(input_file)
+    max_length = max(map(len, messages))
 
     # Part 1
-    parser = build_parser(rules, start=0)
-    p1_answer = sum(validate(m, parser) for m in messages)
+    pattern = compile_rules(rules, start=0, max_length=max_length)
+    p1_answer = sum(bool(pattern.fullmatch(m)) for m in messages)
     print(p1_answer)
 
     # Part 2
     modified_rules = replace_rule(rules, "8: 42 | 42 8")
     modified_rules = replace_rule(modified_rules, "11: 42 31 | 42 11 31")
-    parser = build_parser(modified_rules, start=0)
-    p2_answer = sum(validate(m, parser) for m in messages)
+    pattern = compile_rules(modified_rules, start=0, max_length=max_length)
+    p2_answer = sum(bool(pattern.fullmatch(m)) for m in messages)
     print(p2_answer)
 
 
+def compile_rules(rules: list[str], start: int, max_length: int) -> re.Pattern[str]:
+    """
+    Compiles the rules into a single regular expression which fully matches exactly
+    the valid messages (under the start rule) of at most the given length.
+    Validating a message with this expression avoids the Earley parser altogether.
+    """
+    compiler = RuleCompiler.from_rules(rules)
+    expression = compiler.expand(start, max_length)
+    return re.compile(expression if expression is not None else '(?!)')
+
+
+Rule = Union[str, list[tuple[int, ...]]]
+
+
+@dataclass
+class RuleCompiler:
+    """
+    Converts numbered rules (each either a literal or alternatives of sequences of rules)
+    into regular expressions.
+    Recursive rules such as "8: 42 | 42 8" cannot be expressed by a regular expression in general,
+    so they are unrolled only as deep as a text within a length budget could possibly use,
+    which is determined from the minimum length of text matched by each rule.
+    Only rules which can reach a recursive rule depend on the budget; the others are expanded once in full.
+    """
+    rules: dict[int, Rule]
+    min_lengths: dict[int, float] = field(init=False)
+    budgeted_rules: set[int] = field(init=False)
+    expressions: dict[tuple[int, float], Optional[str]] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.min_lengths = compute_min_lengths(self.rules)
+        reachable = {number: reachable_rules(self.rules, number) for number in self.rules}
+        recursive_rules = {number for number in self.rules if number in reachable[number]}
+        self.budgeted_rules = {number for number in self.rules if reachable[number] & recursive_rules}
+
+    @classmethod
+    def from_rules(cls, rules: list[str]) -> RuleCompiler:
+        parsed_rules = {}
+        for raw in rules:
+            number, body = raw.split(':', maxsplit=1)
+            body = body.strip()
+            if body.startswith('"'):
+                parsed_rules[int(number)] = body.strip('"')
+            else:
+                parsed_rules[int(number)] = [tuple(map(int, alt.split())) for alt in body.split('|')]
+        return RuleCompiler(parsed_rules)
+
+    def expand(self, number: int, budget: float) -> Optional[str]:
+        """
+        Builds the regular expression of the rule restricted to texts of at most `budget` characters,
+        or returns None if there are no such texts.
+        """
+        if budget < self.min_lengths[number]:
+            return None
+        if number not in self.budgeted_rules:
+            budget = math.inf
+        key = (number, budget)
+        if key not in self.expressions:
+            self.expressions[key] = self.expand_alternatives(number, budget)
+        return self.expressions[key]
+
+    def expand_alternatives(self, number: int, budget: float) -> Optional[str]:
+        """
+        Expands each alternative of the rule, where each rule in the sequence may take up the budget
+        less the minimum lengths of all other rules in the sequence.
+        """
+        rule = self.rules[number]
+        if isinstance(rule, str):
+            return re.escape(rule)
+        alternatives = []
+        for sequence in rule:
+            slack = budget - sum(self.min_lengths[n] for n in sequence)
+            if slack < 0:
+                continue
+            if slack == budget and number in sequence:
+                raise ValueError(f"rule {number} is recursive without consuming any text")
+            parts = [self.expand(n, self.min_lengths[n] + slack) for n in sequence]
+            if None not in parts:
+                alternatives.append(''.join(parts))
+        if not alternatives:
+            return None
+        return alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+
+
+def compute_min_lengths(rules: dict[int, Rule]) -> dict[int, float]:
+    """
+    Computes the minimum length of text matched by each rule by iterating until a fixed point.
+    Rules which cannot match any finite text have infinite minimum length.
+    """
+    min_lengths = dict.fromkeys(rules, math.inf)
+    changed = True
+    while changed:
+        changed = False
+        for number, rule in rules.items():
+            if isinstance(rule, str):
+                length = len(rule)
+            else:
+                length = min(sum(min_lengths[n] for n in sequence) for sequence in rule)
+            if length < min_lengths[number]:
+                min_lengths[number] = length
+                changed = True
+    return min_lengths
+
+
+def reachable_rules(rules: dict[int, Rule], number: int) -> set[int]:
+    """
+    Finds all rules which can be used (directly or indirectly) by the given rule, excluding itself
+    unless the rule is recursive.
+    """
+    reached = set()
+    stack = [number]
+    while stack:
+        rule = rules[stack.pop()]
+        if isinstance(rule, str):
+            continue
+        for n in (n for sequence in rule for n in sequence if n not in reached):
+            reached.add(n)
+            stack.append(n)
+    return reached
+
+
 def validate(text: str, parser: Lark) -> bool:
     try:
         parser.parse(text)
@@ -46,11 +171,20 @@ def validate(text: str, parser: Lark) -> bool:
 
 
 def build_parser(rules: list[str], start: int) -> Lark:
-    grammar = '\n'.join(INT_RE.sub(r'rule\1', r) for r in rules)
-    parser = Lark(grammar, start=f'rule{start}', parser='earley')
+    """
+    Builds an Earley parser from the rules (which cannot be cached on disk, see `cached_parser`).
+    """
+    parser = Lark(rules_to_grammar(rules), start=f'rule{start}', parser='earley')
     return parser
 
 
+def rules_to_grammar(rules: list[str]) -> str:
+    """
+    Converts the numbered rules into a Lark grammar whose rule names are prefixed by 'rule'.
+    """
+    return '\n'.join(INT_RE.sub(r'rule\1', r) for r in rules)
+
+
 def replace_rule(rules: list[str], new_rule: str) -> list[str]:
     rule_number, _ = new_rule.split(' ', maxsplit=1)
     rules = [
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import functools
+
+from mysolution.day18_operation_order import solve as day18
+from mysolution.shared.lark_cache import benchmark_parser_cache
+
+
+def main():
+    cases = [
+        ("day18 add_mul_eq (lalr)", day18.ADD_MUL_EQ_GRAMMAR, 'expr'),
+        ("day18 add_b4_mul (lalr)", day18.ADD_B4_MUL_GRAMMAR, 'factor'),
+    ]
+    for name, grammar, start in cases:
+        result = benchmark_parser_cache(functools.partial(day18.build_parser, grammar, start))
+        print(f"{name}: cold {result.cold:.4f}s, cached {result.cached:.4f}s ({result.speedup:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
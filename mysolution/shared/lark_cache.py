@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import stat
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any, NamedTuple, Optional
+
+import lark
+from lark import Lark
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')), 'mysolution', 'lark',
+)
+UNHASHABLE_OPTIONS = ('transformer', 'postlex', 'lexer_callbacks', 'edit_terminals')
+
+
+def cached_parser(grammar: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, **options) -> Lark:
+    """
+    Builds a Lark parser from the grammar text with the given options, reusing the result
+    of an earlier build of the same grammar and options from the cache directory
+    (caching is disabled if the directory is None).
+    Only LALR parsers are cached since Lark (as of 0.11) cannot serialize Earley parsers;
+    other parsers are always built from scratch.
+    Cached parsers are unpickled, so the cache directory must be private to the current user
+    (see `ensure_private_dir`).
+    """
+    if cache_dir is None or options.get('parser', 'earley') != 'lalr':
+        return Lark(grammar, **options)
+    ensure_private_dir(cache_dir)
+    cache_file = os.path.join(cache_dir, f"{cache_key(grammar, options)}.lark")
+    return Lark(grammar, cache=cache_file, **options)
+
+
+def ensure_private_dir(directory: str):
+    """
+    Creates the directory accessible only by the current user if it does not exist yet,
+    or raises PermissionError if the existing directory is a symlink or is owned by another user.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    dir_stat = os.lstat(directory)
+    if stat.S_ISLNK(dir_stat.st_mode) or dir_stat.st_uid != os.getuid():
+        raise PermissionError(f"refusing to use cache directory which is a symlink or owned by another user: {directory}")
+    if stat.S_IMODE(dir_stat.st_mode) & 0o077:
+        os.chmod(directory, 0o700)
+
+
+def cache_key(grammar: str, options: dict[str, Any]) -> str:
+    """
+    Computes the digest of the grammar text and the options which affect the built parser,
+    together with the versions of Lark and Python which affect the serialized format.
+    Options holding callables (e.g. the transformer) are reapplied on every load so they are excluded.
+    """
+    hashable_options = sorted((k, repr(v)) for k, v in options.items() if k not in UNHASHABLE_OPTIONS)
+    key_text = repr((grammar, hashable_options, lark.__version__, sys.version_info[:2]))
+    return hashlib.sha256(key_text.encode()).hexdigest()[:32]
+
+
+class CacheBenchmark(NamedTuple):
+    cold: float
+    cached: float
+
+    @property
+    def speedup(self) -> float:
+        return self.cold / self.cached
+
+
+def benchmark_parser_cache(build_parser: Callable[..., Lark], repeat: int = 5) -> CacheBenchmark:
+    """
+    Compares the best time of building the parser from scratch
+    against the best time of loading it from a warm cache (in a temporary directory),
+    where the parser is built by calling `build_parser(cache_dir=...)` which uses `cached_parser`.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = best_time(lambda: build_parser(cache_dir=None), repeat)
+        build_parser(cache_dir=cache_dir)
+        cached = best_time(lambda: build_parser(cache_dir=cache_dir), repeat)
+    return CacheBenchmark(cold, cached)
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start_time)
+    return min(durations)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import functools
+import math
+from collections.abc import Iterator
+from typing import Optional
+
+import numpy as np
+
+SEGMENT_SIZE = 1 << 16
+FACTOR_TABLE_LIMIT = 1 << 20
+
+
+def primes_up_to(limit: int) -> np.ndarray:
+    """
+    Computes an array of all primes up to the given limit (inclusive)
+    using the sieve of Eratosthenes.
+    """
+    if limit < 2:
+        return np.array([], dtype=np.int64)
+    is_prime = np.ones(limit + 1, dtype=bool)
+    is_prime[:2] = False
+    for value in range(2, math.isqrt(limit) + 1):
+        if is_prime[value]:
+            is_prime[value * value::value] = False
+    return np.flatnonzero(is_prime)
+
+
+def sieve_segment(start: int, stop: int, base_primes: np.ndarray) -> np.ndarray:
+    """
+    Computes a boolean array indicating which integers from start (inclusive) to stop (exclusive)
+    are prime. The base primes must include all primes up to the square root of stop.
+    """
+    is_prime = np.ones(stop - start, dtype=bool)
+    is_prime[:max(2 - start, 0)] = False
+    for prime in base_primes.tolist():
+        if prime * prime >= stop:
+            break
+        first_multiple = max(prime * prime, -(-start // prime) * prime)
+        is_prime[first_multiple - start::prime] = False
+    return is_prime
+
+
+def iter_primes(limit: Optional[int] = None) -> Iterator[int]:
+    """
+    Lazily produces all primes in increasing order up to the given limit (inclusive),
+    or indefinitely if the limit is not given.
+    Primes are sieved one segment at a time so only a single segment is kept in memory.
+    """
+    base_primes = primes_up_to(0)
+    base_limit = 0
+    start = 2
+    while limit is None or start <= limit:
+        stop = start + SEGMENT_SIZE if limit is None else min(start + SEGMENT_SIZE, limit + 1)
+        if base_limit < math.isqrt(stop - 1):
+            base_limit = max(math.isqrt(stop - 1), 2 * base_limit)
+            base_primes = primes_up_to(base_limit)
+        is_prime = sieve_segment(start, stop, base_primes)
+        yield from (start + np.flatnonzero(is_prime)).tolist()
+        start = stop
+
+
+@functools.lru_cache(maxsize=None)
+def smallest_prime_factors(limit: int) -> np.ndarray:
+    """
+    Computes a table whose entry at index n is the smallest prime factor of n
+    for all 2 <= n <= limit. Entries at index 0 and 1 are set to zero.
+    The table is cached per limit.
+    """
+    table = np.zeros(limit + 1, dtype=np.int64)
+    for prime in primes_up_to(math.isqrt(limit)).tolist():
+        multiples = table[prime * prime::prime]
+        multiples[multiples == 0] = prime
+    remaining = np.flatnonzero(table == 0)
+    table[remaining] = remaining
+    table[:2] = 0
+    return table
+
+
+def factorize(value: int) -> dict[int, int]:
+    """
+    Factorizes a positive integer into a mapping from each prime factor to its exponent.
+    Small integers are factorized by repeated lookup in the smallest prime factor table;
+    larger integers are first divided by primes in increasing order
+    until the remaining factor is small enough for the table or turns out to be prime.
+    """
+    if value < 1:
+        raise ValueError(f"expected a positive integer: {value}")
+    factors = {}
+    if value > FACTOR_TABLE_LIMIT:
+        for prime in iter_primes():
+            if value <= FACTOR_TABLE_LIMIT or prime * prime > value:
+                break
+            while value % prime == 0:
+                factors[prime] = factors.get(prime, 0) + 1
+                value //= prime
+        if value > FACTOR_TABLE_LIMIT:
+            factors[value] = factors.get(value, 0) + 1
+            return factors
+
+    table = smallest_prime_factors(FACTOR_TABLE_LIMIT)
+    while value > 1:
+        prime = int(table[value])
+        factors[prime] = factors.get(prime, 0) + 1
+        value //= prime
+    return factors